@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import os
+import ast
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import List
+from sentence_transformers import SentenceTransformer
+
+DASHBOARD_APP = Path("src") / "dashboard" / "app.py"
+DEFAULT_EMBED_MODEL = os.environ.get("HF_SENTENCE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+
+def _read_canon(app_path: Path, name: str) -> List[str]:
+    # Read the label list straight from the dashboard source (importing it would start Streamlit)
+    tree = ast.parse(app_path.read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == name for t in node.targets):
+            return list(ast.literal_eval(node.value))
+    raise SystemExit(f"{name} not found in {app_path}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Encode the dashboard's canonical city/title labels once and save them")
+    ap.add_argument("--output", default="data/canon_embeddings.npz")
+    ap.add_argument("--model", default=DEFAULT_EMBED_MODEL)
+    args = ap.parse_args()
+
+    city = _read_canon(DASHBOARD_APP, "CITY_CANON")
+    title = _read_canon(DASHBOARD_APP, "TITLE_CANON")
+    model = SentenceTransformer(args.model, device="cpu")
+    enc = lambda labels: model.encode(labels, convert_to_numpy=True, normalize_embeddings=True).astype(np.float16)
+
+    outp = Path(args.output)
+    outp.parent.mkdir(parents=True, exist_ok=True)
+    # Labels and model name are stored alongside so the dashboard only uses vectors that match its own lists
+    np.savez(
+        outp,
+        model=np.array(args.model),
+        city=enc(city),
+        city_labels=np.array(city),
+        title=enc(title),
+        title_labels=np.array(title),
+    )
+    print(f"Wrote {outp} ({len(city)} cities, {len(title)} titles) using {args.model}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,26 @@
+import io
 import os
+import gzip
+import hashlib
 from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
 import streamlit as st
-import plotly.express as px
+import plotly.graph_objects as go
 import requests
 
-from sentence_transformers import SentenceTransformer, util
-from typing import List
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import re
 import json
-import boto3
 from zoneinfo import ZoneInfo
-try:
-    from streamlit_autorefresh import st_autorefresh
-except Exception:
-    def st_autorefresh(*args, **kwargs):
-        return None
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+# torch / sentence-transformers / boto3 are imported where they are first used: with the defaults
+# (no S3, precomputed enrichment) the page renders without paying for them at cold start
+if TYPE_CHECKING:
+    import torch
+    from sentence_transformers import SentenceTransformer
 
 
 API_URL = st.secrets.get("API_URL") or os.getenv("API_URL", "")
@@ -58,14 +62,31 @@ S3_META_PREFIX = (
 )
 S3_META_PREFIX = S3_META_PREFIX.strip("/")
 SCHEDULE_HRS = int(os.getenv("SCHEDULE_HOURS", st.secrets.get("SCHEDULE_HOURS", 12)))
-_s3_client = boto3.client("s3", region_name=AWS_REGION)
 NEXT_RUN_REFRESH_SECS = int(os.getenv("NEXT_RUN_REFRESH_SECS", st.secrets.get("NEXT_RUN_REFRESH_SECS", 36000)))  # 10h default
-DATA_REFRESH_SECS = int(os.getenv("DATA_REFRESH_SECS", 300))  # force refresh every N seconds
+DATA_REFRESH_SECS = int(os.getenv("DATA_REFRESH_SECS", 300))  # re-check the data version every N seconds
+
+# One pooled, keep-alive S3 client per process, shared by data loads, version probes and the countdown.
+# Uses explicit keys from Streamlit secrets when present, else the default AWS credential chain.
+@st.cache_resource(show_spinner=False)
+def get_s3_client():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=st.secrets.get("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=st.secrets.get("AWS_SECRET_ACCESS_KEY"),
+        region_name=AWS_REGION,
+        config=Config(retries={"max_attempts": 5, "mode": "standard"}, max_pool_connections=32, tcp_keepalive=True),
+    )
 
-def fetch_next_run_from_s3():
-    key = f"{S3_META_PREFIX}/meta/next_run.json"
+
+# Shared across sessions: the schedule only changes every SCHEDULE_HOURS, so S3 is hit at most once a minute
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_next_run_from_s3(bucket: str = S3_META_BUCKET, prefix: str = S3_META_PREFIX):
+    key = f"{prefix}/meta/next_run.json"
     try:
-        obj = _s3_client.get_object(Bucket=S3_META_BUCKET, Key=key)
+        obj = get_s3_client().get_object(Bucket=bucket, Key=key)
         data = json.loads(obj["Body"].read())
         return datetime.fromisoformat(data.get("next_run_at"))
     except Exception:
@@ -94,8 +115,21 @@ def get_next_run_cached():
 SELF_ENRICH = os.environ.get("SELF_ENRICH", "").strip().lower() in {"1", "true", "yes", "on"}
 SELF_ENRICH_MODE = os.environ.get("SELF_ENRICH_MODE", "embed").strip().lower()  # "embed" or "flan"
 ENRICH_THRESHOLD = float(os.environ.get("ENRICH_THRESHOLD", "0.55"))
+# Self-enrichment labels persisted by url (per mode) so reruns only enrich urls not seen before
+SELF_ENRICH_CACHE_PATH = os.path.splitext(ENRICHED_PATH)[0] + f".{SELF_ENRICH_MODE}.parquet"
 HF_SENTENCE_MODEL = os.environ.get("HF_SENTENCE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 HF_T2T_MODEL = os.environ.get("HF_T2T_MODEL", "google/flan-t5-small")
+FLAN_BATCH_SIZE = 16
+TITLE_MEMO_MAX = 50_000  # distinct titles kept in the process-wide label memo
+# "torch" (default) or "onnx" (onnxruntime, int8 when the model repo ships a quantized export)
+EMBED_BACKEND = os.environ.get("HF_EMBED_BACKEND", "torch").strip().lower()
+ONNX_QUANT_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+# Same choice for the FLAN pipeline (onnx: optimum's ORTModelForSeq2SeqLM); defaults to the embed backend
+T2T_BACKEND = os.environ.get("HF_T2T_BACKEND", EMBED_BACKEND).strip().lower()
+# Optional canonical-label embeddings written by scripts/precompute_canon.py
+CANON_EMBED_PATH = os.environ.get("CANON_EMBED_PATH", "data/canon_embeddings.npz")
+EMBED_QUANTIZE = os.environ.get("EMBED_QUANTIZE", "").strip().lower() in {"1", "true", "yes", "on"}
+EMBED_QUANTIZE_MIN_COS = 0.98  # int8 model is used only if every canon label stays this close to fp32
 # Canonical label sets used for normalization
 CITY_CANON = [
     "Tel Aviv-Yafo",
@@ -129,33 +163,92 @@ st.set_page_config(page_title="Data Scientist Jobs in Israel", layout="wide")
 st.title("Data Scientist Jobs in Israel")
 st.caption("Interactive dashboard of open positions over time")
 
-@st.cache_data(ttl=0)
-def load_data(path: str, remote_url: str, enriched_path: str, s3_version_token: str, local_mtime_token: str, time_bucket_token: str) -> pd.DataFrame:
+# Columns the dashboard uses; everything else in the CSV is never materialized
+LOAD_COLUMNS = ["source", "job_title", "company", "location", "url", "collected_at", "snapshot_id"]
+
+
+def _read_csv_projected(src, block_size: Optional[int] = None) -> pd.DataFrame:
+    # PyArrow's multithreaded reader with column projection; columns absent from older files come back as nulls
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    # Every column is read as text: no per-block type inference, and collected_at is parsed once below
+    opts = pacsv.ConvertOptions(
+        include_columns=LOAD_COLUMNS, include_missing_columns=True, column_types={c: pa.string() for c in LOAD_COLUMNS}
+    )
+    read_opts = pacsv.ReadOptions(block_size=block_size) if block_size else None
+    return pacsv.read_csv(src, read_options=read_opts, convert_options=opts).to_pandas()
+
+
+# Remote reads: 16 MiB network buffer and parse blocks instead of Arrow's 1 MiB default, so a large
+# archive.csv is fetched in a few big ranged reads and parsed in fewer, larger parallel chunks
+S3_READ_BLOCK_SIZE = 16 << 20
+
+
+# Arrow's native S3 filesystem, so S3 objects stream straight into the CSV reader
+@st.cache_resource(show_spinner=False)
+def get_arrow_s3fs():
+    from pyarrow.fs import S3FileSystem  # ImportError when pyarrow was built without S3 support
+
+    return S3FileSystem(
+        access_key=st.secrets.get("AWS_ACCESS_KEY_ID"),
+        secret_key=st.secrets.get("AWS_SECRET_ACCESS_KEY"),
+        region=AWS_REGION,
+    )
+
+
+def _read_s3_csv(key: str) -> pd.DataFrame:
+    try:
+        s3fs = get_arrow_s3fs()
+    except ImportError:
+        s3fs = None
+    if s3fs is not None:
+        path = f"{S3_BUCKET}/{key}"
+        # The runner can store the archive gzip-encoded (OUTPUT_GZIP): sniff the magic bytes, then inflate inline
+        with s3fs.open_input_file(path) as probe:
+            gz = probe.read_at(2, 0) == b"\x1f\x8b"
+        with s3fs.open_input_stream(path, compression="gzip" if gz else None, buffer_size=S3_READ_BLOCK_SIZE) as f:
+            return _read_csv_projected(f, block_size=S3_READ_BLOCK_SIZE)
+    obj = get_s3_client().get_object(Bucket=S3_BUCKET, Key=key)
+    body = obj["Body"].read()
+    if obj.get("ContentEncoding") == "gzip":
+        body = gzip.decompress(body)
+    return _read_csv_projected(io.BytesIO(body))
+
+
+def _read_local_csv(path: str) -> pd.DataFrame:
+    # Serve a parquet side-file when it is at least as new as the CSV; otherwise parse and refresh it
+    parquet_path = os.path.splitext(path)[0] + ".parquet"
+    try:
+        if os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+            return pd.read_parquet(parquet_path)
+    except Exception:
+        pass
+    df = _read_csv_projected(path)
+    try:
+        df.to_parquet(parquet_path, index=False)
+    except Exception:
+        pass
+    return df
+
+
+# No ttl: entries are keyed on the S3 ETag / local mtime / time-bucket / enriched mtime tokens and invalidate exactly when those change.
+# Each token change leaves the previous frame behind, so keep only the last few.
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_data(path: str, remote_url: str, enriched_path: str, s3_version_token: str, local_mtime_token: str, time_bucket_token: str, enriched_mtime_token: str) -> pd.DataFrame:
     # If configured, try S3 first
     if USE_S3 and S3_BUCKET:
         try:
-            import boto3
-            from botocore.config import Config
-            s3 = boto3.client(
-                "s3",
-                aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
-                aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
-                region_name=st.secrets.get("AWS_DEFAULT_REGION", "us-east-1"),
-                config=Config(retries={"max_attempts": 5, "mode": "standard"}),
-            )
-            # Prefer stable keys; otherwise newest *.csv
-            prefix = S3_PREFIX if S3_PREFIX.endswith("/") else (S3_PREFIX + "/")
-            stable_candidates = [
-                f"{prefix}archive.csv",
-                f"{prefix}latest.csv",
-                f"{prefix}jobs_latest.csv",
-                f"{prefix}latest/jobs.csv",
-            ]
+            # Prefer stable keys. The version token already names the key its HEAD found, so GET that one
+            # first instead of walking the candidates with failing GETs.
+            stable_candidates = s3_stable_keys()
+            hinted = s3_version_token.split(":", 1)[0]
+            if hinted in stable_candidates:
+                stable_candidates.remove(hinted)
+                stable_candidates.insert(0, hinted)
             df = None
             for latest_key in stable_candidates:
                 try:
-                    obj = s3.get_object(Bucket=S3_BUCKET, Key=latest_key)
-                    df = pd.read_csv(obj["Body"])
+                    df = _read_s3_csv(latest_key)
                     break
                 except Exception:
                     df = None
@@ -174,15 +267,18 @@ def load_data(path: str, remote_url: str, enriched_path: str, s3_version_token:
     if df is None:
         # Try local file first
         if os.path.exists(path):
-            df = pd.read_csv(path)
+            df = _read_local_csv(path)
         else:
             # Fallback to remote CSV (raw GitHub)
             try:
-                df = pd.read_csv(remote_url)
+                resp = requests.get(remote_url, timeout=30)
+                resp.raise_for_status()
+                df = _read_csv_projected(io.BytesIO(resp.content))
             except Exception:
                 return pd.DataFrame(columns=["source", "job_title", "company", "location", "url", "collected_at"])
     if "collected_at" in df.columns:
-        df["collected_at"] = pd.to_datetime(df["collected_at"]).dt.date
+        # Runner writes ISO dates: explicit format + cache parses in C and keeps a packed datetime64 column
+        df["collected_at"] = pd.to_datetime(df["collected_at"], format="%Y-%m-%d", cache=True, errors="coerce")
     # Ensure expected columns exist (add snapshot_id if missing)
     for c in ["source", "job_title", "company", "location", "url", "collected_at"]:
         if c not in df.columns:
@@ -192,100 +288,264 @@ def load_data(path: str, remote_url: str, enriched_path: str, s3_version_token:
     # If enriched file exists, merge in normalized columns by URL
     if os.path.exists(enriched_path):
         try:
-            df_en = pd.read_csv(enriched_path, usecols=["url", "city_normalized", "title_normalized"]).drop_duplicates("url")
-            df = df.merge(df_en, on="url", how="left")
+            # Project the three columns and push the url predicate into the Arrow scan so only matching rows materialize
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+            import pyarrow.dataset as pads
+            enriched_cols = ["url", "city_normalized", "title_normalized"]
+            fmt = pads.CsvFileFormat(convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in enriched_cols}))
+            scan = pads.dataset(enriched_path, format=fmt).to_table(
+                columns=enriched_cols,
+                filter=pads.field("url").isin(df["url"].dropna().astype(str).unique().tolist()),
+            )
+            df_en = scan.to_pandas().drop_duplicates("url")
+            # validate: a duplicated enriched url would otherwise silently fan out postings
+            df = df.merge(df_en, on="url", how="left", validate="m:1")
         except Exception:
             pass
-    base_cols = ["source", "job_title", "company", "location", "url", "collected_at"]
+    # Trend key parsed once per load instead of per rerun: the snapshot timestamp, else the collection
+    # date for legacy rows without a snapshot_id
+    df["_snapshot_ts"] = pd.to_datetime(df["snapshot_id"], format="%Y%m%dT%H%M%SZ", errors="coerce").fillna(
+        pd.to_datetime(df["collected_at"], errors="coerce")
+    )
+    base_cols = ["source", "job_title", "company", "location", "url", "collected_at", "_snapshot_ts"]
     if "snapshot_id" in df.columns:
         base_cols.append("snapshot_id")
     if "city_normalized" in df.columns:
         base_cols.extend(["city_normalized", "title_normalized"])
-    return df[base_cols]
+    # Low-cardinality columns: categorical codes make isin/nunique/value_counts and the per-distinct-value
+    # normalizers integer ops. Arrow-backed titles let the per-keystroke str.contains filter run in Arrow's
+    # string kernels.
+    dtypes = {c: "category" for c in ("source", "company", "location", "city_normalized", "title_normalized") if c in base_cols}
+    return df[base_cols].astype({**dtypes, "job_title": "string[pyarrow]"})
 
 
-def get_data_version_tokens() -> tuple[str, str, str]:
-    # S3 version token: ETag+LastModified of first available stable key
-    s3_token = ""
-    if USE_S3 and S3_BUCKET:
-        try:
-            s3c = boto3.client("s3", region_name=AWS_REGION)
-            prefix = S3_PREFIX if S3_PREFIX.endswith("/") else (S3_PREFIX + "/")
-            for key in [f"{prefix}archive.csv", f"{prefix}latest.csv", f"{prefix}jobs_latest.csv", f"{prefix}latest/jobs.csv"]:
-                try:
-                    head = s3c.head_object(Bucket=S3_BUCKET, Key=key)
-                    s3_token = f"{key}:{head.get('ETag')}:{head.get('LastModified')}"
-                    break
-                except Exception:
-                    continue
-        except Exception:
-            pass
-    # Local mtime token
+def s3_stable_keys() -> List[str]:
+    prefix = S3_PREFIX if S3_PREFIX.endswith("/") else (S3_PREFIX + "/")
+    return [f"{prefix}archive.csv", f"{prefix}latest.csv", f"{prefix}jobs_latest.csv", f"{prefix}latest/jobs.csv"]
+
+
+@st.cache_resource(show_spinner=False)
+def get_io_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="s3-io")
+
+
+def get_data_version_tokens(s3c) -> tuple[str, str, str, str]:
+    s3_token = _s3_version_token(s3c) if USE_S3 and S3_BUCKET else ""
+    # load_data is keyed on these tokens, so it re-downloads only when the S3 object or local file changes.
+    # A remote CSV URL has no version of its own; only when it is the actual source (no S3 object, no
+    # local file) does the time bucket force a periodic refresh.
+    local_token = _local_mtime_token()
+    time_token = current_time_bucket() if not s3_token and not local_token and REMOTE_CSV else ""
+    return s3_token, local_token, time_token, _local_mtime_token(ENRICHED_PATH)
+
+
+def _s3_version_token(s3c) -> str:
+    # ETag+LastModified of the first available stable key
+    keys = s3_stable_keys()
+    # One LIST of the prefix returns ETag/LastModified for every candidate at once, so a missing
+    # archive.csv doesn't cost a failed HEAD per fallback key. The stable keys sort ahead of meta/,
+    # so the first page covers them.
     try:
-        local_token = str(os.path.getmtime(DATA_PATH))
+        prefix = S3_PREFIX if S3_PREFIX.endswith("/") else (S3_PREFIX + "/")
+        listed = {o["Key"]: o for o in s3c.list_objects_v2(Bucket=S3_BUCKET, Prefix=prefix).get("Contents", [])}
+        found = next((k for k in keys if k in listed), None)
+        if found:
+            return f"{found}:{listed[found]['ETag']}:{listed[found]['LastModified']}"
     except Exception:
-        local_token = ""
+        # No s3:ListBucket permission (or LIST failed): probe the keys with HEAD instead
+        pass
+    # HEAD every candidate at once (one round trip instead of one per missing key), then take the first
+    # hit in priority order
+    with ThreadPoolExecutor(max_workers=len(keys), thread_name_prefix="s3-head") as ex:
+        heads = [ex.submit(s3c.head_object, Bucket=S3_BUCKET, Key=key) for key in keys]
+        for key, fut in zip(keys, heads):
+            try:
+                head = fut.result()
+                return f"{key}:{head.get('ETag')}:{head.get('LastModified')}"
+            except Exception:
+                continue
+    return ""
+
+
+def _local_mtime_token(path: str = DATA_PATH) -> str:
+    try:
+        return str(os.path.getmtime(path))
+    except Exception:
+        return ""
+
+
+def current_time_bucket() -> str:
     # Time bucket token to force refresh every N seconds
-    time_token = str(int(max(1, DATA_REFRESH_SECS) and time.time() // max(1, DATA_REFRESH_SECS)))
-    return s3_token, local_token, time_token
+    return str(int(max(1, DATA_REFRESH_SECS) and time.time() // max(1, DATA_REFRESH_SECS)))
+
+
+# Inference device and similarity dtype, resolved (and torch imported) on first model use
+@st.cache_resource(show_spinner=False)
+def get_torch_runtime() -> Tuple[str, "torch.dtype"]:
+    import torch
+
+    device = "cuda" if torch.cuda.is_available() else ("mps" if torch.backends.mps.is_available() else "cpu")
+    # Reduced precision for the (already L2-normalized) similarity matmul: fp16 on CUDA, bf16 on CPUs with native
+    # AVX-512 BF16 dot products; elsewhere fp32, since emulated bf16 would be slower
+    if device == "cuda":
+        sim_dtype = torch.float16
+    elif device == "cpu" and getattr(torch.cpu, "_is_avx512_bf16_supported", lambda: False)():
+        sim_dtype = torch.bfloat16
+    else:
+        sim_dtype = torch.float32
+    return device, sim_dtype
 
 
 # Cached model loader so the embedding model is initialized once
 @st.cache_resource(show_spinner=False)
-def get_embed_model(model_name: str) -> SentenceTransformer:
-    return SentenceTransformer(model_name)
+def get_embed_model(model_name: str) -> "SentenceTransformer":
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if EMBED_BACKEND == "onnx":
+        # onnxruntime with the model repo's int8 (AVX-512 VNNI) export; same encode() API as the torch path
+        try:
+            return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": ONNX_QUANT_FILE})
+        except Exception:
+            # No pre-quantized file in the repo: sentence-transformers exports an FP32 ONNX graph on the fly
+            return SentenceTransformer(model_name, backend="onnx")
+    device, _ = get_torch_runtime()
+    model = SentenceTransformer(model_name, device=device)
+    if EMBED_QUANTIZE and device == "cpu":
+        # Dynamic int8 quantization of the Linear layers: ~2x less weight bandwidth on CPU, negligible cosine drift
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        # Guard against drift: keep fp32 unless the int8 model reproduces the canon-label embeddings
+        probe = TITLE_CANON + CITY_CANON
+        ref = model.encode(probe, convert_to_tensor=True, normalize_embeddings=True)
+        q = quantized.encode(probe, convert_to_tensor=True, normalize_embeddings=True)
+        if float((ref * q).sum(dim=1).min()) >= EMBED_QUANTIZE_MIN_COS:
+            return quantized
+    return model
+
+
+# Cached text2text pipeline for SELF_ENRICH_MODE=flan; batched calls pad/tokenize once per batch
+@st.cache_resource(show_spinner=False)
+def get_t2t_pipeline(model_name: str):
+    import torch
+    from transformers import pipeline
+
+    if T2T_BACKEND == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            from transformers import AutoTokenizer
+        except ImportError:
+            pass  # optimum[onnxruntime] not installed: use the torch pipeline below
+        else:
+            # Encoder/decoder exported to ONNX once at load; onnxruntime runs them with full graph fusion
+            model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            return pipeline("text2text-generation", model=model, tokenizer=tokenizer, batch_size=FLAN_BATCH_SIZE)
+    device, sim_dtype = get_torch_runtime()
+    # bf16 weights only where the CPU has native bf16 dot products; T5 overflows in fp16, so CUDA/MPS stay fp32
+    return pipeline(
+        "text2text-generation",
+        model=model_name,
+        device=device if device != "cpu" else -1,
+        batch_size=FLAN_BATCH_SIZE,
+        torch_dtype=torch.bfloat16 if sim_dtype == torch.bfloat16 else None,
+        model_kwargs={"low_cpu_mem_usage": True},
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_precomputed_canon(path: str) -> Dict[Tuple[str, Tuple[str, ...]], np.ndarray]:
+    # {(model, labels): fp16 vectors}; empty when the file is missing or unreadable
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            model = str(z["model"])
+            return {(model, tuple(z[f"{name}_labels"].tolist())): z[name] for name in ("city", "title")}
+    except Exception:
+        return {}
+
+
+# Canonical label lists are constants: use the precomputed vectors when they match this model and label
+# list, else encode each once per model and reuse across reruns
+@st.cache_resource(show_spinner=False)
+def get_canon_embeddings(model_name: str, canon: Tuple[str, ...]):
+    pre = load_precomputed_canon(CANON_EMBED_PATH).get((model_name, canon))
+    if pre is not None:
+        import torch
+
+        return torch.from_numpy(pre).to(torch.float32)
+    return get_embed_model(model_name).encode(list(canon), convert_to_tensor=True, normalize_embeddings=True)
+
+
+# Process-wide title -> label memo shared by all sessions and data versions: a new snapshot mostly repeats
+# titles already seen, so only genuinely new titles reach the heuristic and the encoder
+@st.cache_resource(show_spinner=False)
+def get_title_label_memo(model_name: str, threshold: float) -> Dict[str, str]:
+    return {}
+
+
+def _nearest_canon(texts: List[str], canon: Tuple[str, ...], model_name: str) -> List[Tuple[float, int]]:
+    # (best cosine, canon index) per text: one batched encode, then one matmul against the cached canon vectors
+    model = get_embed_model(model_name)
+    emb_canon = get_canon_embeddings(model_name, canon)
+    _, sim_dtype = get_torch_runtime()
+    embs = model.encode(list(texts), batch_size=64, convert_to_tensor=True, normalize_embeddings=True, show_progress_bar=False)
+    # Both sides are L2-normalized, so the dot product is the cosine similarity
+    scores, idx = (embs.to(sim_dtype) @ emb_canon.to(embs.device, sim_dtype).T).float().max(dim=1)
+    return list(zip(scores.tolist(), idx.tolist()))
 
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def canonicalize_titles_cached(titles: List[str], model_name: str, threshold: float) -> List[str]:
-    # Deduplicate while preserving order
-    unique: List[str] = []
-    seen = set()
-    for t in titles:
-        t0 = (t or "").strip()
-        if t0 not in seen:
-            seen.add(t0)
-            unique.append(t0)
+    memo = get_title_label_memo(model_name, threshold)
+    # Deduplicate while preserving order; titles labelled by an earlier call are taken from the memo
+    unique = list(dict.fromkeys((t or "").strip() for t in titles))
+    mapping = {u: memo[u] for u in unique if u in memo}
+    todo = [u for u in unique if u not in mapping]
     # Heuristic first
-    mapping = {u: (classify_title_heuristic(u) or "") for u in unique}
-    missing = [u for u in unique if not mapping[u]]
+    fresh = dict(zip(todo, classify_titles(pd.Series(todo, dtype=object))))
+    # Only heuristic misses reach the encoder, in one batched call; length-sorted so each mini-batch pads
+    # to its own longest title
+    missing = sorted((u for u in todo if not fresh[u]), key=len)
+    failed = set()
     if missing:
         try:
-            model = get_embed_model(model_name)
-            emb_canon = model.encode(TITLE_CANON, convert_to_tensor=True, normalize_embeddings=True)
-            emb = model.encode(missing, convert_to_tensor=True, normalize_embeddings=True)
-            from sentence_transformers import util as st_util
-            sims = st_util.cos_sim(emb, emb_canon)
-            for i, u in enumerate(missing):
-                idx = int(sims[i].argmax())
-                score = float(sims[i][idx])
-                mapping[u] = TITLE_CANON[idx] if score >= threshold else "Other"
+            for u, (score, i) in zip(missing, _nearest_canon(missing, tuple(TITLE_CANON), model_name)):
+                fresh[u] = TITLE_CANON[i] if score >= threshold else "Other"
         except Exception:
+            failed = set(missing)
             for u in missing:
-                mapping[u] = "Other"
+                fresh[u] = "Other"
+    if len(memo) + len(fresh) > TITLE_MEMO_MAX:
+        memo.clear()
+    # Encoder failures aren't memoized, so a later call retries them
+    memo.update((u, v) for u, v in fresh.items() if u not in failed)
+    mapping.update(fresh)
     # Build result list preserving original order
     return [mapping.get((t or "").strip(), "Other") for t in titles]
 
 
-def normalize_strings_embed(values: List[str], canon_list: List[str], model: SentenceTransformer, threshold: float) -> List[str]:
-    emb_canon = model.encode(canon_list, convert_to_tensor=True, normalize_embeddings=True)
-    out: List[str] = []
-    for v in values:
-        txt = (v or "").strip()
-        if not txt:
-            out.append("")
-            continue
-        emb = model.encode([txt], convert_to_tensor=True, normalize_embeddings=True)
-        sim = util.cos_sim(emb, emb_canon)[0]
-        idx = int(sim.argmax())
-        score = float(sim[idx])
-        out.append(canon_list[idx] if score >= threshold else txt)
-    return out
+# Cached on the distinct strings so reruns (e.g. the 1s countdown refresh) never re-encode the same inputs
+@st.cache_data(ttl=3600, show_spinner=False)
+def embed_label_mapping(unique: Tuple[str, ...], canon: Tuple[str, ...], model_name: str, threshold: float) -> Dict[str, str]:
+    return {
+        txt: (canon[i] if score >= threshold else txt)
+        for txt, (score, i) in zip(unique, _nearest_canon(list(unique), canon, model_name))
+    }
+
+
+def normalize_strings_embed(values: List[str], canon_list: List[str], model_name: str, threshold: float) -> List[str]:
+    texts = [(v or "").strip() for v in values]
+    # Titles/locations repeat heavily: encode each distinct non-empty string once, in one batched call.
+    # Length-sorting keeps each mini-batch padded only to its own longest string.
+    unique = tuple(sorted(dict.fromkeys(t for t in texts if t), key=len))
+    if not unique:
+        return [""] * len(texts)
+    mapping = embed_label_mapping(unique, tuple(canon_list), model_name, threshold)
+    return [mapping.get(t, "") for t in texts]
 
 
 def normalize_strings_flan(values: List[str], canon_list: List[str], gen) -> List[str]:
     labels = ", ".join(canon_list)
-    out: List[str] = []
     instruction = (
         "Classify the job title into EXACTLY ONE of these labels: [" + labels + "]. "
         "Rules: If the title contains 'research data scientist' choose 'Data Scientist'. "
@@ -300,222 +560,391 @@ def normalize_strings_flan(values: List[str], canon_list: List[str], gen) -> Lis
         "If the role is unrelated to data/ai/ml (e.g., developer advocate, growth, marketing, acquisition, sales, product manager), choose 'Other'. "
         "Output ONLY the label text."
     )
-    examples = [
-        ("Research Data Scientist, Waze Personalized Experience", "Data Scientist"),
-        ("Senior Machine Learning Engineer (GenAI)", "Machine Learning Engineer"),
-        ("AI Engineer", "AI Engineer"),
-        ("Applied Data Scientist", "Data Scientist"),
-        ("Data Engineer II - GenAI", "Data Engineer"),
-        ("Head of Data Science", "Data Science Manager"),
-        ("Developer Advocate, GenAI", "Other"),
-        ("User Acquisition Team Lead - Paid Social", "Other"),
-        ("Product AI Lab Team Lead", "Data Science Manager"),
-    ]
-    shots = "\n".join([f"Title: {t}\nLabel: {y}" for t, y in examples])
-    for v in values:
-        txt = (v or "").strip()
-        if not txt:
-            out.append("")
-            continue
-        prompt = instruction + "\n" + shots + "\nTitle: " + txt + "\nLabel:"
-        try:
-            resp = gen(prompt, max_new_tokens=8)
-            pred = (resp[0]["generated_text"] or "").strip()
-            out.append(pred if pred in canon_list else "Other")
-        except Exception:
-            out.append("Other")
-    return out
+    # Classify each distinct input once, in one batched pipeline call, then map back to rows
+    texts = [(v or "").strip() for v in values]
+    unique = sorted(set(texts) - {""})
+    if not unique:
+        return [""] * len(texts)
+    # Instruction + rules only: the few-shot block was ~200 prompt tokens per input for a few-token answer,
+    # and titles still get the classify_titles pass afterwards
+    prompts = [instruction + "\nTitle: " + txt + "\nLabel:" for txt in unique]
+    try:
+        resps = gen(prompts, max_new_tokens=8, batch_size=FLAN_BATCH_SIZE, do_sample=False, num_beams=1)
+        preds = [(r["generated_text"] or "").strip() for r in resps]
+    except Exception:
+        preds = ["Other"] * len(unique)
+    mapping = {txt: (pred if pred in canon_list else "Other") for txt, pred in zip(unique, preds)}
+    return [mapping.get(t, "") for t in texts]
+
+
+@st.cache_resource(show_spinner=False)
+def get_fetch_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="fetch-trigger")
 
 
 def trigger_fetch():
     if not API_URL:
         st.error("API_URL not set in Streamlit secrets or env")
         return None
-    # no params — backend will use its defaults/config
-    return requests.post(API_URL, json={}, timeout=25)
-
-
-def normalize_city(loc: str) -> str:
-    if not isinstance(loc, str) or not loc.strip():
-        return "Tel Aviv-Yafo"
-    t = " ".join(loc.replace("\n", " ").split()).strip(", ")
-    tl = t.lower()
-    # If generic country
-    if tl in {"israel", "il"}:
-        return "Tel Aviv-Yafo"
-    # Strip trailing country tokens like ', Israel' or ', IL'
-    t = re.sub(r"\s*,\s*(israel|il)\s*$", "", t, flags=re.IGNORECASE)
-    tl = t.lower()
-    # Tel Aviv variants
-    tel_variants = ["tel aviv-yafo", "tel-aviv-yafo", "tel aviv yafo", "tel aviv", "tel-aviv"]
-    if any(v in tl for v in tel_variants):
-        return "Tel Aviv-Yafo"
-    mapping = {
-        "jerusalem": "Jerusalem",
-        "haifa": "Haifa",
-        "herzliya": "Herzliya",
-        "ra'anana": "Ra'anana",
-        "beer sheva": "Beer Sheva",
-        "be'er sheva": "Beer Sheva",
-        "bnei brak": "Bnei Brak",
-        "benei brak": "Bnei Brak",
-        "bene brak": "Bnei Brak",
-        "netanya": "Netanya",
-        "ashdod": "Ashdod",
-        "ashkelon": "Ashkelon",
-        "rishon": "Rishon LeZion",
-        "petah tikva": "Petah Tikva",
-    }
-    for k, v in mapping.items():
-        if k in tl:
-            return v
-    # Default to original (without country)
-    return t
+    # no params — backend will use its defaults/config. Sent off the script thread so the UI stays
+    # responsive; the fetch_status fragment polls the stored future for the response.
+    future = get_fetch_executor().submit(requests.post, API_URL, json={}, timeout=25)
+    st.session_state["_fetch_future"] = future
+    st.session_state.pop("_fetch_status", None)
+    return future
+
+
+# Lower-cased location fragments → canonical city, in priority order: Tel Aviv variants win over any other
+# city in the same string ("Herzliya, Tel Aviv District"), then the first listed alias found
+_CITY_ALIASES = {
+    "tel aviv-yafo": "Tel Aviv-Yafo",
+    "tel-aviv-yafo": "Tel Aviv-Yafo",
+    "tel aviv yafo": "Tel Aviv-Yafo",
+    "tel aviv": "Tel Aviv-Yafo",
+    "tel-aviv": "Tel Aviv-Yafo",
+    "jerusalem": "Jerusalem",
+    "haifa": "Haifa",
+    "herzliya": "Herzliya",
+    "ra'anana": "Ra'anana",
+    "beer sheva": "Beer Sheva",
+    "be'er sheva": "Beer Sheva",
+    "bnei brak": "Bnei Brak",
+    "benei brak": "Bnei Brak",
+    "bene brak": "Bnei Brak",
+    "netanya": "Netanya",
+    "ashdod": "Ashdod",
+    "ashkelon": "Ashkelon",
+    "rishon": "Rishon LeZion",
+    "petah tikva": "Petah Tikva",
+}
+# Single alternation (longest alias first): one regex pass tells whether any alias occurs at all
+_CITY_RE = re.compile(
+    "(" + "|".join(re.escape(k) for k in sorted(_CITY_ALIASES, key=len, reverse=True)) + ")",
+    re.IGNORECASE,
+)
+_COUNTRY_SUFFIX_RE = re.compile(r"\s*,\s*(israel|il)\s*$", re.IGNORECASE)
 
 
-def classify_title_heuristic(title: str) -> str:
-    if not isinstance(title, str):
-        return ""
-    t_raw = title.strip()
-    t = t_raw.lower()
-    if not t:
-        return ""
+def normalize_city_series(locs: pd.Series) -> pd.Series:
+    # Locations repeat heavily: run the string passes over the distinct values only, then broadcast back
+    codes, uniques = pd.factorize(locs, use_na_sentinel=False)
+    return pd.Series(_normalize_city_values(pd.Series(uniques, dtype=object)).to_numpy()[codes], index=locs.index)
+
+
+def _normalize_city_values(locs: pd.Series) -> pd.Series:
+    raw = locs.where(locs.map(lambda x: isinstance(x, str)), "")
+    t = raw.str.replace(r"\s+", " ", regex=True).str.strip().str.strip(", ")
+    # Blank or generic country-only locations default to Tel Aviv
+    generic = raw.str.strip().eq("") | t.str.lower().isin({"israel", "il"})
+    # Strip trailing country tokens like ', Israel' or ', IL'
+    t = t.str.replace(_COUNTRY_SUFFIX_RE, "", regex=True)
+    tl = t.str.lower()
+    # np.select takes the first alias whose mask hits, so the alias order above decides, not the position in
+    # the string. Default to original (without country)
+    city = np.select(
+        [tl.str.contains(alias, regex=False).to_numpy(dtype=bool) for alias in _CITY_ALIASES],
+        list(_CITY_ALIASES.values()),
+        default=t.to_numpy(dtype=object),
+    )
+    return pd.Series(city, index=t.index, dtype=object).mask(generic, "Tel Aviv-Yafo")
+
+
+def coalesce_city(primary: pd.Series, fallback: pd.Series) -> pd.Series:
+    # Use the normalized/predicted city where present, else the raw location, then normalize in one pass
+    present = primary.astype("string").str.strip().str.len().gt(0).fillna(False).astype(bool)
+    # object first: either side may be categorical, whose where() can't take values outside its categories
+    return normalize_city_series(primary.astype(object).where(present, fallback.astype(object)))
+
+
+def _alternation(patterns: List[str]) -> "re.Pattern[str]":
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
+# Title heuristic patterns, compiled once at import (one alternation per label family).
+# Groups are non-capturing so Series.str.contains doesn't warn about match groups.
+_TITLE_PAREN_SUFFIX_RE = re.compile(r"\s+\(.*?\)$")
+_LEADERSHIP_RE = re.compile(r"\b(?:head|lead|manager|director|vp)\b")
+_DATA_DOMAIN_RE = re.compile(r"\bdata\b|\bai\b|\bml\b|\banalytic")
+_DS_RE = _alternation([
+    r"data scientist", r"machine learning scientist",
+    r"\bapplied scientist\b", r"\bquant\w* scientist\b", r"\bcomput(?:ational|er) scientist\b",  # applied/quant/computational
+])
+_MLE_RE = _alternation([
+    r"\bml\b[^a-zA-Z]*eng", r"machine learning engineer", r"ml engineer", r"ml software engineer",
+    r"deep learning engineer", r"computer vision(?: engineer|)\b|\bcv engineer\b", r"nlp engineer",
+    r"ai/ml engineer", r"gen(?:erative)? ai engineer", r"genai engineer", r"ml developer|ai/ml developer",
+    r"mlops\b|ml ops|ml platform|ml infrastructure", r"research engineer\b",
+])
+_AI_RE = _alternation([r"\bai engineer\b", r"\bgen(?:erative)? ai\b", r"\bai specialist\b", r"\bai developer\b"])
+_DE_RE = _alternation([r"\bdata engineer\b", r"\banalytics engineer\b", r"etl engineer\b", r"data platform\b", r"data infra"])
+_DA_RE = _alternation([r"\bdata analyst\b", r"business analyst\b", r"product analyst\b", r"analytics? analyst\b"])
+_ARCH_DOMAIN_RE = _alternation([r"\bdata\b", r"\bai\b", r"\bml\b", r"analytics"])
+_ML_FALLBACK_RE = _alternation([r"\bml\b", r"machine learning\b"])
+
+
+def classify_titles(titles: pd.Series) -> pd.Series:
+    # Titles repeat heavily across postings/snapshots: classify each distinct title once, then broadcast back
+    codes, uniques = pd.factorize(titles, use_na_sentinel=False)
+    return pd.Series(_classify_title_values(pd.Series(uniques, dtype=object)).to_numpy()[codes], index=titles.index, dtype=object)
+
+
+def _classify_title_values(titles: pd.Series) -> pd.Series:
+    # Vectorized title heuristic as a decision cascade: rules run in priority order (first matching rule wins),
+    # each as a column-wide regex pass over only the titles no earlier rule has claimed. Most titles are
+    # decided by the first few rules, so the fallbacks scan a small remainder. Returns "" where no rule applies.
+    raw = titles.astype(object)
+    t = raw.where(raw.map(lambda x: isinstance(x, str)), "").str.strip().str.lower()
     # Normalize common noise
-    t = re.sub(r"\s+\(.*?\)$", "", t)
-    # Helper matchers
-    def has(*words: str) -> bool:
-        return all(w in t for w in words)
-    def any_re(patterns: list[str]) -> bool:
-        return any(re.search(p, t) for p in patterns)
-
-    # Leadership / management (prioritize before DS catch-alls)
-    if any_re([r"\b(head|lead|manager|director|vp)\b"]) and any_re([r"\bdata\b|\bai\b|\bml\b|\banalytic"]):
-        return "Data Science Manager"
-
-    # Data Scientist family
-    if (
-        "data scientist" in t
-        or "applied data scientist" in t
-        or "machine learning scientist" in t
-        or "research data scientist" in t
-        or any_re([r"\bapplied scientist\b", r"\bquant\w* scientist\b", r"\bcomput(ational|er) scientist\b"])  # applied/quant/computational
-    ):
-        return "Data Scientist"
-
-    # Machine Learning Engineer family (incl. deep learning / CV / NLP / MLOps / research engineer)
-    if (
-        any_re([
-            r"\bml\b[^a-zA-Z]*eng", r"machine learning engineer", r"ml engineer", r"ml software engineer",
-            r"deep learning engineer", r"computer vision( engineer|)\b|\bcv engineer\b", r"nlp engineer",
-            r"ai/ml engineer", r"gen(erative)? ai engineer", r"genai engineer", r"ml developer|ai/ml developer",
-            r"mlops\b|ml ops|ml platform|ml infrastructure", r"research engineer\b"
-        ])
-    ):
-        return "Machine Learning Engineer"
-
-    # AI Engineer (general AI that is not clearly ML Eng)
-    if any_re([r"\bai engineer\b", r"\bgen(erative)? ai\b", r"\bai specialist\b", r"\bai developer\b"]) and "ml" not in t:
-        return "AI Engineer"
-
-    # Data Engineer family
-    if any_re([r"\bdata engineer\b", r"\banalytics engineer\b", r"etl engineer\b", r"data platform\b", r"data infra"]):
-        return "Data Engineer"
-
-    # Data Analyst family
-    if any_re([r"\bdata analyst\b", r"business analyst\b", r"product analyst\b", r"analytics? analyst\b"]):
-        return "Data Analyst"
-
-    # Architect
-    if "architect" in t and any_re([r"\bdata\b", r"\bai\b", r"\bml\b", r"analytics"]):
-        return "Data Architect"
-
-    # Research Scientist
-    if "research scientist" in t:
-        return "Research Scientist"
-
-    # Default: try lightweight fallbacks
-    if "scientist" in t:
-        return "Data Scientist"
-    if any_re([r"\bml\b", r"machine learning\b"]) and "engineer" in t:
-        return "Machine Learning Engineer"
-    if "analyst" in t:
-        return "Data Analyst"
+    t = t.str.replace(_TITLE_PAREN_SUFFIX_RE, "", regex=True)
+
+    def has(rx: "re.Pattern[str]"):
+        return lambda s: s.str.contains(rx, regex=True)
+
+    def sub(word: str):
+        return lambda s: s.str.contains(word, regex=False)
+
+    def both(a, b):
+        return lambda s: a(s) & b(s)
+
+    def but_not(a, b):
+        return lambda s: a(s) & ~b(s)
+
+    rules = [
+        # Leadership / management (prioritize before DS catch-alls)
+        (both(has(_LEADERSHIP_RE), has(_DATA_DOMAIN_RE)), "Data Science Manager"),
+        # Data Scientist family
+        (has(_DS_RE), "Data Scientist"),
+        # Machine Learning Engineer family (incl. deep learning / CV / NLP / MLOps / research engineer)
+        (has(_MLE_RE), "Machine Learning Engineer"),
+        # AI Engineer (general AI that is not clearly ML Eng)
+        (but_not(has(_AI_RE), sub("ml")), "AI Engineer"),
+        (has(_DE_RE), "Data Engineer"),
+        (has(_DA_RE), "Data Analyst"),
+        (both(sub("architect"), has(_ARCH_DOMAIN_RE)), "Data Architect"),
+        (sub("research scientist"), "Research Scientist"),
+        # Lightweight fallbacks
+        (sub("scientist"), "Data Scientist"),
+        (both(has(_ML_FALLBACK_RE), sub("engineer")), "Machine Learning Engineer"),
+        (sub("analyst"), "Data Analyst"),
+    ]
+    labels = np.full(len(t), "", dtype=object)
+    pending = np.arange(len(t))
+    for cond, label in rules:
+        if not len(pending):
+            break
+        hit = cond(t.iloc[pending]).to_numpy(dtype=bool)
+        labels[pending[hit]] = label
+        pending = pending[~hit]
+    return pd.Series(labels, index=titles.index, dtype=object)
+
+
+def first_nonempty(*series: pd.Series) -> pd.Series:
+    # Row-wise "a or b or c" over aligned string Series
+    out = series[-1]
+    for s in reversed(series[:-1]):
+        out = s.where(s.ne(""), out)
+    return out
 
-    return ""
+
+# Aggregations are cached on filter_key; the frame itself is excluded from hashing (leading underscore)
+@st.cache_data(show_spinner=False, max_entries=64)
+def location_distribution(filter_key: tuple, _frame: pd.DataFrame) -> pd.DataFrame:
+    # Always normalize; rows without a normalized city fall back to the raw location
+    if "city_normalized" in _frame.columns:
+        city_series = coalesce_city(_frame["city_normalized"], _frame["location"])
+    else:
+        city_series = normalize_city_series(_frame["location"])
+    loc_counts = city_series.value_counts(dropna=False).reset_index()
+    loc_counts.columns = ["city", "count"]
+    loc_counts["percent"] = (loc_counts["count"] / loc_counts["count"].sum() * 100).round(1)
+    loc_counts["percent_label"] = loc_counts["percent"].astype(str) + "%"
+    return loc_counts
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def title_distribution(filter_key: tuple, _frame: pd.DataFrame, model_name: str, threshold: float, top_n: int = 12) -> pd.DataFrame:
+    raw_titles = _frame["job_title"].fillna("").astype(str).tolist()
+    title_series = pd.Series(canonicalize_titles_cached(raw_titles, model_name, threshold))
+    # value_counts is already sorted descending: take the head and fold the tail into one "Other" row.
+    # Built from plain lists in one construction (row enlargement via .loc reallocates every column).
+    vc = title_series.value_counts()
+    labels, counts = vc.index[:top_n].tolist(), vc.iloc[:top_n].tolist()
+    if len(vc) > top_n:
+        labels.append("Other")
+        counts.append(int(vc.iloc[top_n:].sum()))
+    return pd.DataFrame({"job_title": labels, "count": counts})
+
+
+# Figures are built once per filter_key and cached as plain dicts; reruns with the same selection
+# skip Plotly figure construction and validation and only re-wrap the dict for rendering
+@st.cache_data(show_spinner=False, max_entries=64)
+def location_figure(filter_key: tuple, _frame: pd.DataFrame) -> dict:
+    loc_counts = location_distribution(filter_key, _frame)
+    # graph_objects directly from the cached (already sorted) counts; skips plotly.express' DataFrame introspection
+    fig_loc = go.Figure(go.Bar(x=loc_counts["city"], y=loc_counts["percent"], text=loc_counts["percent_label"]))
+    fig_loc.update_yaxes(title="Percent", range=[0, 100])
+    fig_loc.update_layout(
+        title="Locations (% of filtered)", xaxis_title="Location", yaxis_ticksuffix="%", uniformtext_minsize=10, uniformtext_mode="hide"
+    )
+    return fig_loc.to_dict()
 
 
-with st.sidebar:
+@st.cache_data(show_spinner=False, max_entries=64)
+def title_figure(filter_key: tuple, _frame: pd.DataFrame, model_name: str, threshold: float) -> dict:
+    # Titles pie (apply canonical mapping so categories are stable) — batch + cached
+    title_counts = title_distribution(filter_key, _frame, model_name, threshold)
+    fig_titles = go.Figure(go.Pie(labels=title_counts["job_title"], values=title_counts["count"]))
+    fig_titles.update_layout(title="Titles distribution (filtered)")
+    return fig_titles.to_dict()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def trend_figure(filter_key: tuple, _frame: pd.DataFrame) -> dict:
+    # Group by the load-time snapshot key (snapshot_id timestamp, else collected_at); groupby drops NaT and sorts
+    by_snap = _frame.groupby("_snapshot_ts", sort=True).size().rename_axis("snapshot_ts").reset_index(name="count")
+    # graph_objects rather than px.line: same chart, without importing plotly.express at startup
+    fig = go.Figure(go.Scatter(x=by_snap["snapshot_ts"], y=by_snap["count"], mode="lines+markers"))
+    fig.update_layout(title="Open positions over time", xaxis_title="snapshot_ts", yaxis_title="count")
+    return fig.to_dict()
+
+
+def self_enrich(part: pd.DataFrame) -> pd.DataFrame:
+    # city_normalized / title_normalized for the given rows, aligned on their index
+    loc_values = part.get("location", pd.Series([""] * len(part))).astype(object).fillna("").astype(str).tolist()
+    title_values = part.get("job_title", pd.Series([""] * len(part))).fillna("").astype(str).tolist()
+    if SELF_ENRICH_MODE == "flan":
+        try:
+            gen = get_t2t_pipeline(HF_T2T_MODEL)
+            # Locations the alias regex already recognises skip the LLM: coalesce_city maps their raw value
+            needs_llm = pd.Series(loc_values, index=part.index).str.extract(_CITY_RE, expand=False).isna()
+            city_llm = pd.Series("", index=part.index, dtype=object)
+            city_llm[needs_llm] = normalize_strings_flan(
+                [v for v, m in zip(loc_values, needs_llm) if m], CITY_CANON, gen
+            )
+            title_llm = normalize_strings_flan(title_values, TITLE_CANON, gen)
+            # Apply heuristic as a final pass to collapse verbose variants
+            title_llm_s = pd.Series(title_llm, index=part.index)
+            return pd.DataFrame({
+                "city_normalized": coalesce_city(city_llm, part["location"]),
+                "title_normalized": first_nonempty(classify_titles(title_llm_s), title_llm_s),
+            })
+        except Exception as e:
+            st.warning(f"LLM enrich failed ({e}); falling back to embeddings")
+    city_embed = normalize_strings_embed(loc_values, CITY_CANON, HF_SENTENCE_MODEL, ENRICH_THRESHOLD)
+    heurs = classify_titles(pd.Series(title_values, index=part.index))
+    embed_titles = normalize_strings_embed(title_values, TITLE_CANON, HF_SENTENCE_MODEL, ENRICH_THRESHOLD)
+    return pd.DataFrame({
+        "city_normalized": coalesce_city(pd.Series(city_embed, index=part.index), part["location"]),
+        "title_normalized": first_nonempty(heurs, pd.Series(embed_titles, index=part.index), pd.Series(title_values, index=part.index)),
+    })
+
+
+def read_self_enrich_cache(path: str) -> pd.DataFrame:
+    # url-indexed labels from earlier self-enrichment runs; empty when missing or unreadable
+    try:
+        return pd.read_parquet(path, columns=["url", "city_normalized", "title_normalized"]).drop_duplicates("url").set_index("url")
+    except Exception:
+        return pd.DataFrame(columns=["city_normalized", "title_normalized"], index=pd.Index([], name="url"))
+
+
+def write_self_enrich_cache(path: str, cache: pd.DataFrame, fresh: pd.DataFrame) -> None:
+    out = pd.concat([cache.reset_index(), fresh[["url", "city_normalized", "title_normalized"]]], ignore_index=True)
+    try:
+        out.dropna(subset=["url"]).drop_duplicates("url", keep="last").to_parquet(path, index=False)
+    except Exception:
+        pass  # read-only filesystem: labels are recomputed next run
+
+
+# Start the data-version HEAD probes now so they overlap with the countdown's next_run.json read
+# (the cached client is resolved here, on the script thread, and handed to the worker)
+tokens_future = get_io_executor().submit(get_data_version_tokens, get_s3_client() if USE_S3 and S3_BUCKET else None)
+
+@st.fragment(run_every="1s")
+def next_fetch_countdown() -> None:
+    # Only this fragment reruns every second; the full script reruns on user input, or here once the
+    # DATA_REFRESH_SECS time bucket rolls over so data refresh still happens without interaction
+    if st.session_state.get("_time_bucket") not in (None, current_time_bucket()):
+        st.rerun()
     st.subheader("Next scheduled fetch")
     next_dt = get_next_run_cached()
     if not next_dt:
         st.caption("No schedule found yet. It will appear after the first scheduled run writes metadata.")
+        return
+    tz = ZoneInfo("Asia/Jerusalem")
+    target = next_dt.astimezone(tz) if next_dt.tzinfo else next_dt.replace(tzinfo=timezone.utc).astimezone(tz)
+    now = datetime.now(timezone.utc).astimezone(tz)
+    remaining = (target - now).total_seconds()
+    if remaining <= 0:
+        st.success(f"Next fetch is due now (scheduled for {target:%Y-%m-%d %H:%M:%S %Z}) 🚀")
+        # Force next rerun to fetch fresh schedule from S3
+        st.session_state["_next_run_last_checked"] = datetime(1970,1,1,tzinfo=timezone.utc)
     else:
-        tz = ZoneInfo("Asia/Jerusalem")
-        target = next_dt.astimezone(tz) if next_dt.tzinfo else next_dt.replace(tzinfo=timezone.utc).astimezone(tz)
-        now = datetime.now(timezone.utc).astimezone(tz)
-        remaining = (target - now).total_seconds()
-        # Smooth seconds: refresh every second while the timer is displayed
-        st_autorefresh(interval=1000, key="next-fetch-ticker")
-        if remaining <= 0:
-            st.success(f"Next fetch is due now (scheduled for {target:%Y-%m-%d %H:%M:%S %Z}) 🚀")
-            # Force next rerun to fetch fresh schedule from S3
-            st.session_state["_next_run_last_checked"] = datetime(1970,1,1,tzinfo=timezone.utc)
+        h = int(remaining // 3600)
+        m = int((remaining % 3600) // 60)
+        s = int(remaining % 60)
+        st.metric("Time to next fetch", f"{h:02d}:{m:02d}:{s:02d}", help=f"Scheduled at {target:%Y-%m-%d %H:%M:%S %Z}")
+        total = max(1, SCHEDULE_HRS * 3600)
+        elapsed = total - int(remaining)
+        st.progress(min(1.0, elapsed / total))
+
+
+@st.fragment(run_every="1s")
+def fetch_status() -> None:
+    # Polls the trigger_fetch future on its own timer, so the response shows up without user input.
+    # The result is reported once into session state and stays until dismissed or the next fetch.
+    future = st.session_state.get("_fetch_future")
+    if future is not None:
+        if not future.done():
+            st.info("Starting fetch…")
+            return
+        st.session_state.pop("_fetch_future", None)
+        try:
+            resp = future.result()
+        except Exception as e:
+            st.session_state["_fetch_status"] = (False, f"Failed: {e}", None)
         else:
-            h = int(remaining // 3600)
-            m = int((remaining % 3600) // 60)
-            s = int(remaining % 60)
-            st.metric("Time to next fetch", f"{h:02d}:{m:02d}:{s:02d}", help=f"Scheduled at {target:%Y-%m-%d %H:%M:%S %Z}")
-            total = max(1, SCHEDULE_HRS * 3600)
-            elapsed = total - int(remaining)
-            st.progress(min(1.0, elapsed / total))
+            message = "Fetch started ✅. Check S3 soon." if resp.ok else f"Failed: {resp.status_code}"
+            st.session_state["_fetch_status"] = (resp.ok, message, resp.text)
+    status = st.session_state.get("_fetch_status")
+    if status is None:
+        return
+    ok, message, body = status
+    (st.success if ok else st.error)(message)
+    if body is not None:
+        st.code(body, language="json")
+    st.button("Dismiss", key="_dismiss_fetch_status", on_click=lambda: st.session_state.pop("_fetch_status", None))
+
+
+with st.sidebar:
+    next_fetch_countdown()
 
     st.header("Filters")
     if ENABLE_FETCH:
         if st.button("Fetch more now", type="primary"):
-            with st.spinner("Starting fetch…"):
-                resp = trigger_fetch()
-            if resp is not None:
-                if resp.ok:
-                    st.success("Fetch started ✅. Check S3 soon.")
-                else:
-                    st.error(f"Failed: {resp.status_code}")
-                st.code(resp.text, language="json")
+            trigger_fetch()
+        fetch_status()
     elif ENABLE_FETCH and not API_URL:
         st.warning("Set API_URL in Streamlit secrets to enable fetching.")
 
 
-    s3_tok, local_tok, time_tok = get_data_version_tokens()
-    df = load_data(DATA_PATH, REMOTE_CSV, ENRICHED_PATH, s3_tok, local_tok, time_tok)
+    s3_tok, local_tok, time_tok, enriched_tok = tokens_future.result()
+    # The countdown fragment reruns the script when this bucket rolls over, re-probing the version tokens
+    st.session_state["_time_bucket"] = current_time_bucket()
+    df = load_data(DATA_PATH, REMOTE_CSV, ENRICHED_PATH, s3_tok, local_tok, time_tok, enriched_tok)
     # If no enriched columns present and SELF_ENRICH is enabled, compute in-memory
     if SELF_ENRICH and ("city_normalized" not in df.columns or "title_normalized" not in df.columns):
         with st.spinner("Enriching locations and titles in-memory…"):
-            loc_values = df.get("location", pd.Series([""] * len(df))).fillna("").astype(str).tolist()
-            title_values = df.get("job_title", pd.Series([""] * len(df))).fillna("").astype(str).tolist()
-            if SELF_ENRICH_MODE == "flan":
-                try:
-                    gen = get_t2t_pipeline(HF_T2T_MODEL)
-                    city_llm = normalize_strings_flan(loc_values, CITY_CANON, gen)
-                    title_llm = normalize_strings_flan(title_values, TITLE_CANON, gen)
-                    df["city_normalized"] = [normalize_city(c if c else lv) for c, lv in zip(city_llm, loc_values)]
-                    # Apply heuristic as a final pass to collapse verbose variants
-                    df["title_normalized"] = [classify_title_heuristic(t) or t for t in title_llm]
-                except Exception as e:
-                    st.warning(f"LLM enrich failed ({e}); falling back to embeddings")
-                    model = get_embed_model(HF_SENTENCE_MODEL)
-                    city_embed = normalize_strings_embed(loc_values, CITY_CANON, model, ENRICH_THRESHOLD)
-                    df["city_normalized"] = [normalize_city(c if c else lv) for c, lv in zip(city_embed, loc_values)]
-                    heurs = [classify_title_heuristic(t) for t in title_values]
-                    embed_titles = normalize_strings_embed(title_values, TITLE_CANON, model, ENRICH_THRESHOLD)
-                    df["title_normalized"] = [h or e or tv for h, e, tv in zip(heurs, embed_titles, title_values)]
-            else:
-                model = get_embed_model(HF_SENTENCE_MODEL)
-                city_embed = normalize_strings_embed(loc_values, CITY_CANON, model, ENRICH_THRESHOLD)
-                df["city_normalized"] = [normalize_city(c if c else lv) for c, lv in zip(city_embed, loc_values)]
-                heurs = [classify_title_heuristic(t) for t in title_values]
-                embed_titles = normalize_strings_embed(title_values, TITLE_CANON, model, ENRICH_THRESHOLD)
-                df["title_normalized"] = [h or e or tv for h, e, tv in zip(heurs, embed_titles, title_values)]
+            # Write-through cache: urls labelled on an earlier run reuse their labels; only new urls are enriched
+            cache = read_self_enrich_cache(SELF_ENRICH_CACHE_PATH)
+            df["city_normalized"] = df["url"].map(cache["city_normalized"])
+            df["title_normalized"] = df["url"].map(cache["title_normalized"])
+            todo = (df["city_normalized"].isna() | df["title_normalized"].isna()).to_numpy()
+            if todo.any():
+                fresh = self_enrich(df.loc[todo])
+                df.loc[todo, ["city_normalized", "title_normalized"]] = fresh
+                write_self_enrich_cache(SELF_ENRICH_CACHE_PATH, cache, fresh.assign(url=df.loc[todo, "url"]))
         mode_label = "FLAN-T5" if SELF_ENRICH_MODE == "flan" else "embeddings"
-        st.caption(f"Using self-enrichment ({mode_label}) for normalized city/title (no CSV saved)")
+        st.caption(f"Using self-enrichment ({mode_label}) for normalized city/title (labels cached by URL, no CSV saved)")
     sources = sorted(df["source"].dropna().unique().tolist())
     selected_sources = st.multiselect("Source", options=sources, default=sources)
 
@@ -524,24 +953,35 @@ with st.sidebar:
 
     title_filter = st.text_input("Title contains", value="")
 
-filtered = df.copy()
-if selected_sources:
-    filtered = filtered[filtered["source"].isin(selected_sources)]
-if selected_companies:
-    filtered = filtered[filtered["company"].isin(selected_companies)]
+# Build one boolean mask and index once, instead of copying the frame and slicing repeatedly
+mask = np.ones(len(df), dtype=bool)
+# Everything selected (the default) keeps every non-null row, so only a narrowed selection costs an isin pass
+if selected_sources and len(selected_sources) < len(sources):
+    mask &= df["source"].isin(selected_sources).to_numpy()
+elif selected_sources:
+    mask &= df["source"].notna().to_numpy()
+if selected_companies and len(selected_companies) < len(companies):
+    mask &= df["company"].isin(selected_companies).to_numpy()
+elif selected_companies:
+    mask &= df["company"].notna().to_numpy()
 if title_filter:
-    filtered = filtered[filtered["job_title"].str.contains(title_filter, case=False, na=False)]
+    # Literal substring match: no regex compile, and input like "C++" can't raise
+    mask &= df["job_title"].str.contains(title_filter, case=False, na=False, regex=False).to_numpy(dtype=bool)
+# No selection narrows anything (the default): reuse the frame instead of materializing an identical one
+filtered = df if mask.all() else df.loc[mask]
+# Identifies the filtered subset: same data version + same selected rows → same aggregations
+# (the mask bit-packed to N/8 bytes and digested: cheaper than hashing every index value, and collision-safe)
+filter_key = (s3_tok, local_tok, time_tok, enriched_tok, hashlib.blake2b(np.packbits(mask).tobytes(), digest_size=16).hexdigest())
 
 col1, col2, col3 = st.columns(3)
 col1.metric("Total postings", len(filtered))
 col2.metric("Unique companies", filtered["company"].nunique())
 # Snapshot count: unique snapshot_id (non-empty) + unique collected_at for rows missing snapshot_id
 if "snapshot_id" in filtered.columns:
-    sid_series = filtered["snapshot_id"].astype(str).str.strip()
-    mask_has_sid = sid_series.ne("") & ~sid_series.isna()
-    count_sid = sid_series[mask_has_sid].nunique()
-    count_fallback = filtered.loc[~mask_has_sid, "collected_at"].nunique() if "collected_at" in filtered.columns else 0
-    snapshots_count = int(count_sid + count_fallback)
+    # One key per row (its snapshot_id, or its collection date for legacy rows) and a single nunique
+    sid = filtered["snapshot_id"].astype("string").str.strip()
+    key = sid.where(sid.notna() & sid.ne(""), filtered["collected_at"].astype("string"))
+    snapshots_count = int(key.nunique())
 else:
     snapshots_count = filtered["collected_at"].nunique()
 col3.metric("Snapshots", snapshots_count)
@@ -550,54 +990,26 @@ col3.metric("Snapshots", snapshots_count)
 if not filtered.empty:
     dist_col1, dist_col2 = st.columns(2)
 
-    # Location percentages (always normalize with normalize_city)
-    base_city = filtered["city_normalized"] if "city_normalized" in filtered.columns else filtered["location"]
-    city_series = base_city.fillna("").map(normalize_city)
-    loc_counts = city_series.value_counts(dropna=False).reset_index()
-    loc_counts.columns = ["city", "count"]
-    loc_counts["percent"] = (loc_counts["count"] / loc_counts["count"].sum() * 100).round(1)
-    loc_counts["percent_label"] = loc_counts["percent"].astype(str) + "%"
-    fig_loc = px.bar(loc_counts, x="city", y="percent", text="percent_label", title="Locations (% of filtered)")
-    fig_loc.update_yaxes(title="Percent", range=[0, 100])
-    fig_loc.update_layout(xaxis_title="Location", yaxis_ticksuffix="%", uniformtext_minsize=10, uniformtext_mode="hide")
-    dist_col1.plotly_chart(fig_loc, use_container_width=True)
+    dist_col1.plotly_chart(go.Figure(location_figure(filter_key, filtered)), use_container_width=True)
+    dist_col2.plotly_chart(
+        go.Figure(title_figure(filter_key, filtered, HF_SENTENCE_MODEL, ENRICH_THRESHOLD)), use_container_width=True
+    )
 
-    # Titles pie (apply canonical mapping so categories are stable) — batch + cached
-    raw_titles = filtered["job_title"].fillna("").astype(str).tolist()
-    title_series = pd.Series(canonicalize_titles_cached(raw_titles, HF_SENTENCE_MODEL, ENRICH_THRESHOLD))
-    title_counts = title_series.value_counts().reset_index()
-    title_counts.columns = ["job_title", "count"]
-    top_n = 12
-    if len(title_counts) > top_n:
-        top = title_counts.iloc[:top_n].copy()
-        other = pd.DataFrame([["Other", title_counts.iloc[top_n:]["count"].sum()]], columns=["job_title", "count"])
-        title_counts = pd.concat([top, other], ignore_index=True)
-    fig_titles = px.pie(title_counts, names="job_title", values="count", title="Titles distribution (filtered)")
-    dist_col2.plotly_chart(fig_titles, use_container_width=True)
-
-# Trend over time — group by snapshot_id when present, else collected_at
+# Trend over time
 if not filtered.empty:
-    if "snapshot_id" in filtered.columns:
-        sid = pd.to_datetime(filtered["snapshot_id"], format="%Y%m%dT%H%M%SZ", errors="coerce")
-    else:
-        sid = pd.to_datetime(pd.Series([pd.NaT] * len(filtered)))
-    cat = pd.to_datetime(filtered["collected_at"], errors="coerce")
-    key = sid.fillna(cat)
-    trend = pd.DataFrame({"snapshot_ts": key})
-    by_snap = (
-        trend.groupby("snapshot_ts").size().reset_index(name="count").dropna(subset=["snapshot_ts"]).sort_values("snapshot_ts")
-    )
-    fig = px.line(by_snap, x="snapshot_ts", y="count", markers=True, title="Open positions over time")
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(go.Figure(trend_figure(filter_key, filtered)), use_container_width=True)
 
     st.subheader("All postings (newest first)")
-    all_posts = (
-        filtered.sort_values(["collected_at", "company", "job_title"], ascending=[False, True, True])
-        .reset_index(drop=True)
+    # Hide normalized helper columns in the table view; project first so the sort only gathers the visible
+    # columns, and skip reset_index (the index is hidden anyway) to avoid another full copy
+    hide_cols = ["title_normalized", "city_normalized", "_snapshot_ts"]
+    visible_cols = [c for c in filtered.columns if c not in hide_cols]
+    all_posts = filtered[visible_cols].sort_values(["collected_at", "company", "job_title"], ascending=[False, True, True])
+    st.dataframe(
+        all_posts,
+        use_container_width=True,
+        hide_index=True,
+        column_config={"collected_at": st.column_config.DateColumn("collected_at")},
     )
-    # Hide normalized helper columns in the table view
-    hide_cols = ["title_normalized", "city_normalized"]
-    visible_cols = [c for c in all_posts.columns if c not in hide_cols]
-    st.dataframe(all_posts[visible_cols], use_container_width=True, hide_index=True)
 else:
     st.info("No data yet. Ensure data/jobs.csv exists in the repo or set DASHBOARD_DATA_URL to a CSV.") 
\ No newline at end of file
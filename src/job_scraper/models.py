@@ -1,8 +1,15 @@
 from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache
 
 
-@dataclass
+@lru_cache(maxsize=64)
+def _iso_date(d: date) -> str:
+    # A run stamps every posting with the same as_of date, so it is formatted once rather than once per row
+    return d.isoformat()
+
+
+@dataclass(slots=True)
 class JobPosting:
     source: str
     job_title: str
@@ -18,5 +25,5 @@ class JobPosting:
             "company": self.company,
             "location": self.location,
             "url": self.url,
-            "collected_at": self.collected_at.isoformat(),
+            "collected_at": _iso_date(self.collected_at),
         } 
\ No newline at end of file
@@ -1,11 +1,24 @@
 from __future__ import annotations
 import argparse
-from datetime import date, datetime, timedelta
-from typing import List, Set
+import multiprocessing
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
 import os
 import io
+import glob
+import csv
+import gzip
+import zlib
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pacsv
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 from .config import AppConfig, ensure_dirs, load_sources_config
@@ -20,7 +33,103 @@ from .scrapers import (
 )
 
 
-def append_to_s3_archive(df_run: pd.DataFrame) -> None:
+@lru_cache(maxsize=1)
+def _s3_client():
+    # One pooled keep-alive client per process, shared by the seen-URL read and the archive write
+    return boto3.client("s3", config=Config(retries={"max_attempts": 5, "mode": "standard"}, tcp_keepalive=True))
+
+
+# S3 requires every multipart part except the last to be >= 5 MiB, and a single copied part is capped at 5 GiB
+_MIN_COPY_PART = 5 * 1024 * 1024
+_MAX_COPY_PART = 5 * 1024 * 1024 * 1024
+# Full archive rewrites go up as parallel 8 MiB multipart chunks once they pass the threshold
+_ARCHIVE_TRANSFER = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024, max_concurrency=10, use_threads=True
+)
+# Opt-in: store archive.csv gzip-compressed with Content-Encoding: gzip (readers here and in the dashboard detect it)
+ARCHIVE_GZIP = os.getenv("OUTPUT_GZIP", "false").lower() == "true"
+
+
+def _archive_stream(obj: dict):
+    # get_object body as something Arrow's CSV reader can consume, inflating gzip-encoded archives on the fly
+    if obj.get("ContentEncoding") == "gzip":
+        return pa.CompressedInputStream(pa.PythonFile(obj["Body"], mode="r"), "gzip")
+    return obj["Body"]
+
+
+def _keep_last_by_url(table: pa.Table) -> pa.Table:
+    # Deduplicate on URL (keep latest row): the last row index per url, taken back in file order
+    dedup_keys = ["url"] if "url" in table.column_names else table.column_names
+    row_idx = table.append_column("__row", pa.array(range(table.num_rows), type=pa.int64()))
+    keep = row_idx.group_by(dedup_keys).aggregate([("__row", "max")]).column("__row_max")
+    return table.take(keep.take(pc.sort_indices(keep)))
+
+
+def _append_rows_server_side(s3, bucket: str, key: str, run_table: pa.Table) -> bool:
+    # Append without downloading the archive: part 1 is a server-side UploadPartCopy of the current object,
+    # part 2 is just this run's rows. Returns False (caller does a full merge) when the object is too small
+    # for a copy part or its header doesn't cover the run's columns.
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key)
+    except ClientError:
+        return False
+    size = int(head["ContentLength"])
+    if not _MIN_COPY_PART <= size <= _MAX_COPY_PART:
+        return False
+    etag = head["ETag"]
+    # The new part matches the object's existing encoding: concatenated gzip members are still one valid gzip stream
+    gz = head.get("ContentEncoding") == "gzip"
+    first = s3.get_object(Bucket=bucket, Key=key, Range="bytes=0-65535", IfMatch=etag)["Body"].read()
+    if gz:
+        first = zlib.decompressobj(wbits=31).decompress(first)
+        last = b"\n"  # archives are only ever written by Arrow here, which terminates every row
+    else:
+        last = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={size - 1}-{size - 1}", IfMatch=etag)["Body"].read()
+    header = next(csv.reader(io.StringIO(first.split(b"\n", 1)[0].decode("utf-8").rstrip("\r"))))
+    if not set(run_table.column_names) <= set(header):
+        return False
+    # Rows laid out in the archive's own column order; legacy columns the run doesn't produce stay empty
+    part = pa.table({c: run_table.column(c) if c in run_table.column_names else pa.nulls(run_table.num_rows, pa.string()) for c in header})
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(part, buf, write_options=pacsv.WriteOptions(include_header=False))
+    body = (b"" if last == b"\n" else b"\n") + buf.getvalue().to_pybytes()
+    extra = {"ContentEncoding": "gzip"} if gz else {}
+    if gz:
+        body = gzip.compress(body, compresslevel=6)
+
+    mpu = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType="text/csv", CacheControl="no-cache", **extra)
+    upload_id = mpu["UploadId"]
+    try:
+        copied = s3.upload_part_copy(
+            Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=1,
+            CopySource={"Bucket": bucket, "Key": key}, CopySourceIfMatch=etag,
+        )
+        appended = s3.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=2, Body=body)
+        s3.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [
+                {"PartNumber": 1, "ETag": copied["CopyPartResult"]["ETag"]},
+                {"PartNumber": 2, "ETag": appended["ETag"]},
+            ]},
+        )
+    except Exception:
+        s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    return True
+
+
+def _run_table(postings: List[JobPosting], snapshot_id: str) -> pa.Table:
+    # Column-oriented in a single pass over the postings, straight into Arrow string arrays (no row dicts kept
+    # around and no pandas object blocks)
+    cols: Dict[str, List[str]] = {c: [] for c in COLUMNS if c != "snapshot_id"}
+    for p in postings:
+        for c, v in p.to_row().items():
+            cols[c].append(v)
+    cols["snapshot_id"] = [snapshot_id] * len(postings)
+    return pa.Table.from_pydict(cols, schema=pa.schema([(c, pa.string()) for c in COLUMNS]))
+
+
+def append_to_s3_archive(run_table: pa.Table, *, rows_are_new: bool = False) -> None:
     bucket = os.getenv("OUTPUT_BUCKET")
     prefix = os.getenv("OUTPUT_PREFIX", "snapshots/")
     if not bucket:
@@ -30,49 +139,107 @@ def append_to_s3_archive(df_run: pd.DataFrame) -> None:
         prefix = prefix + "/"
     key = f"{prefix}archive.csv"
 
-    s3 = boto3.client("s3")
-    # Load existing aggregate if present
+    # Everything stays in Arrow as plain strings: the archive is only merged and re-serialized, never analysed,
+    # so there is no pandas copy of the previous rows and no dtype inference to reconcile between the two sides
+    string_types = {c: pa.string() for c in run_table.column_names}
+
+    s3 = _s3_client()
+    if rows_are_new:
+        # Every url was already checked against the archive's seen set, so only the run itself can hold duplicates
+        run_table = _keep_last_by_url(run_table)
+        if _append_rows_server_side(s3, bucket, key, run_table):
+            print(f"[s3] appended to s3://{bucket}/{key} rows+={run_table.num_rows} (server-side copy)")
+            return
+
+    # Load existing aggregate if present (parsed straight off the response stream by Arrow's threaded reader)
     try:
         obj = s3.get_object(Bucket=bucket, Key=key)
-        df_prev = pd.read_csv(io.BytesIO(obj["Body"].read()))  # type: ignore[arg-type]
+        prev_table = pacsv.read_csv(
+            _archive_stream(obj),
+            convert_options=pacsv.ConvertOptions(column_types=string_types, strings_can_be_null=True),
+        )
+        # Legacy columns keep their inferred type; missing ones are null-filled on the run side
+        table_all = pa.concat_tables([prev_table, run_table], promote_options="permissive")
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code")
         if code in ("NoSuchKey", "404"):
-            df_prev = pd.DataFrame(columns=df_run.columns)
+            table_all = run_table
         else:
             raise
 
-    # Append and deduplicate on URL (keep latest row)
-    df_all = pd.concat([df_prev, df_run], ignore_index=True)
-    if "url" in df_all.columns:
-        df_all.drop_duplicates(subset=["url"], keep="last", inplace=True)
-    else:
-        df_all.drop_duplicates(keep="last", inplace=True)
+    table_all = _keep_last_by_url(table_all)
 
-    # Write back
-    buf = io.StringIO()
-    df_all.to_csv(buf, index=False)
-    s3.put_object(Bucket=bucket, Key=key, Body=buf.getvalue(), ContentType="text/csv", CacheControl="no-cache")
-    print(f"[s3] appended+dedup to s3://{bucket}/{key} rows={len(df_all)}")
+    # Write back (gzip shrinks the repeated source/company/location text roughly 10x on the wire and at rest)
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(table_all, buf)
+    body = buf.getvalue()
+    extra = {"ContentType": "text/csv", "CacheControl": "no-cache"}
+    if ARCHIVE_GZIP:
+        body = gzip.compress(body, compresslevel=6)
+        extra["ContentEncoding"] = "gzip"
+    s3.upload_fileobj(io.BytesIO(body), bucket, key, ExtraArgs=extra, Config=_ARCHIVE_TRANSFER)
+    print(f"[s3] appended+dedup to s3://{bucket}/{key} rows={table_all.num_rows}")
 
 
-def load_seen_urls_from_s3() -> Set[str]:
+def _url_hashes(urls: Iterable[str]) -> np.ndarray:
+    # 64-bit URL hashes from pandas' vectorized C hashing: a set of ints is a fraction of the size of a set of
+    # long URL strings, and membership tests never touch the strings again
+    return pd.util.hash_array(np.asarray(list(urls), dtype=object), categorize=False)
+
+
+def _take_unseen(posts: List[JobPosting], seen: Set[int]) -> List[JobPosting]:
+    # Keep postings whose URL isn't in `seen` yet (first one wins within the batch) and mark them as seen
+    kept: List[JobPosting] = []
+    for p, h in zip(posts, _url_hashes(p.url for p in posts).tolist()):
+        if h not in seen:
+            seen.add(h)
+            kept.append(p)
+    return kept
+
+
+def load_seen_urls_from_s3(cache_dir: Optional[str] = None) -> Set[int]:
     bucket = os.getenv("OUTPUT_BUCKET")
     prefix = os.getenv("OUTPUT_PREFIX", "snapshots/")
-    seen: Set[str] = set()
+    seen: Set[int] = set()
     if not bucket:
         return seen
     if prefix and not prefix.endswith("/"):
         prefix = prefix + "/"
     key = f"{prefix}archive.csv"
-    s3 = boto3.client("s3")
+    s3 = _s3_client()
+    # The hash set is kept on disk next to the archive's ETag: an unchanged archive costs one HEAD, not a download
+    if cache_dir:
+        try:
+            etag = s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+        except ClientError:
+            return seen
+        cached = os.path.join(cache_dir, f"seen_urls.{etag}.npy")
+        if os.path.exists(cached):
+            try:
+                return set(np.load(cached).tolist())
+            except (OSError, ValueError):
+                pass
     try:
         obj = s3.get_object(Bucket=bucket, Key=key)
-        df_prev = pd.read_csv(io.BytesIO(obj["Body"].read()))  # type: ignore[arg-type]
-        if "url" in df_prev.columns:
-            seen = set(df_prev["url"].dropna().astype(str).tolist())
+        # Only the url column is converted (the rest are tokenized and skipped), parsed straight off the stream
+        urls = pacsv.read_csv(
+            _archive_stream(obj),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=["url"], include_missing_columns=True, column_types={"url": pa.string()}
+            ),
+        ).column("url")
+        hashes = _url_hashes(urls.drop_null().to_numpy(zero_copy_only=False))
+        seen = set(hashes.tolist())
     except ClientError:
-        pass
+        return seen
+    if cache_dir:
+        try:
+            for stale in glob.glob(os.path.join(cache_dir, "seen_urls.*.npy")):
+                os.remove(stale)
+            etag = obj["ETag"].strip('"')
+            np.save(os.path.join(cache_dir, f"seen_urls.{etag}.npy"), hashes)
+        except OSError:
+            pass
     return seen
 
 
@@ -94,79 +261,80 @@ def run_once(as_of: date, cfg: AppConfig) -> int:
 
     all_postings: List[JobPosting] = []
     # Unique snapshot id per run (UTC timestamp)
-    snapshot_id = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    snapshot_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
 
     # Load seen URLs to skip duplicates during scraping
-    seen_urls: Set[str] = load_seen_urls_from_s3()
-
-    # LinkedIn via SerpAPI (optional)
-    linkedin_cfg = (sources_cfg.get("linkedin_serpapi") or {})
-    if linkedin_cfg.get("enabled"):
-        scraper = SerpapiLinkedInScraper(
-            api_key=cfg.serpapi_api_key,
-            query=linkedin_cfg.get("query", "Data Scientist"),
-            location=linkedin_cfg.get("location", "Israel"),
-        )
-        sp_posts = [p for p in scraper.fetch(as_of=as_of) if p.url not in seen_urls]
-        all_postings.extend(sp_posts)
-        seen_urls.update(p.url for p in sp_posts)
-
-    # LinkedIn via SearchApi.io (optional) — skip URLs already seen
-    searchapi_cfg = (sources_cfg.get("searchapi_linkedin") or {})
-    if searchapi_cfg.get("enabled"):
-        sa_scraper = SearchApiLinkedInScraper(
-            api_key=os.getenv("SEARCHAPI_API_KEY"),
-            query=searchapi_cfg.get("query", "Data Scientist"),
-            location=searchapi_cfg.get("location", "Israel"),
-        )
-        sa_posts = [p for p in sa_scraper.fetch(as_of=as_of) if p.url not in seen_urls]
-        all_postings.extend(sa_posts)
-        seen_urls.update(p.url for p in sa_posts)
-
-    # LinkedIn via Playwright (optional, requires credentials) with pagination/time budget and URL skip
-    li_pw_cfg = (sources_cfg.get("linkedin_playwright") or {})
-    if li_pw_cfg.get("enabled"):
-        headless = str(li_pw_cfg.get("headless", os.getenv("LINKEDIN_HEADLESS", "true"))).lower() == "true"
-        max_jobs = int(li_pw_cfg.get("max_jobs", os.getenv("LINKEDIN_MAX_JOBS", 60)))
-        max_pages = int(li_pw_cfg.get("max_pages", 8))
-        time_budget_sec = int(li_pw_cfg.get("time_budget_sec", 300))
-        li_pw = LinkedInPlaywrightScraper(
-            query=li_pw_cfg.get("query", "Data Scientist"),
-            location=li_pw_cfg.get("location", "Israel"),
-            headless=headless,
-            max_jobs=max_jobs,
-            max_pages=max_pages,
-            time_budget_sec=time_budget_sec,
-        )
-        li_posts = [p for p in li_pw.fetch(as_of=as_of) if p.url not in seen_urls]
-        all_postings.extend(li_posts)
-        seen_urls.update(p.url for p in li_posts)
-
-    # Greenhouse
-    greenhouse_cfg = (sources_cfg.get("greenhouse") or {})
-    if greenhouse_cfg.get("enabled"):
-        boards = greenhouse_cfg.get("companies") or []
-        gh_scraper = GreenhouseScraper(boards=boards, title_keywords=greenhouse_cfg.get("title_keywords"))
-        gh_posts = [p for p in gh_scraper.fetch(as_of=as_of) if p.url not in seen_urls]
-        all_postings.extend(gh_posts)
-        seen_urls.update(p.url for p in gh_posts)
-
-    # Lever
-    lever_cfg = (sources_cfg.get("lever") or {})
-    if lever_cfg.get("enabled"):
-        companies = lever_cfg.get("companies") or []
-        lv_scraper = LeverScraper(companies=companies, title_keywords=lever_cfg.get("title_keywords"))
-        lv_posts = [p for p in lv_scraper.fetch(as_of=as_of) if p.url not in seen_urls]
-        all_postings.extend(lv_posts)
-        seen_urls.update(p.url for p in lv_posts)
+    seen_urls: Set[int] = load_seen_urls_from_s3(cache_dir=cfg.data_dir)
+    # A non-empty seen set means the archive was read, so everything kept below is new to it
+    archive_checked = bool(seen_urls)
+
+    # Every source is independent IO, so they all run at once and the wall time is the slowest scraper rather
+    # than the sum. Playwright gets its own (spawned) process so driving Chromium never competes with the HTTP
+    # scrapers for the GIL; the HTTP scrapers share a thread pool. Futures are merged in the fixed order below
+    # (SerpAPI, SearchApi, Playwright, Greenhouse, Lever), so duplicate URLs resolve exactly as in a serial run.
+    futures: List[Future] = []
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as ppe, \
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="source") as tpe:
+        # LinkedIn via SerpAPI (optional)
+        linkedin_cfg = (sources_cfg.get("linkedin_serpapi") or {})
+        if linkedin_cfg.get("enabled"):
+            scraper = SerpapiLinkedInScraper(
+                api_key=cfg.serpapi_api_key,
+                query=linkedin_cfg.get("query", "Data Scientist"),
+                location=linkedin_cfg.get("location", "Israel"),
+            )
+            futures.append(tpe.submit(scraper.fetch, as_of=as_of))
+
+        # LinkedIn via SearchApi.io (optional)
+        searchapi_cfg = (sources_cfg.get("searchapi_linkedin") or {})
+        if searchapi_cfg.get("enabled"):
+            sa_scraper = SearchApiLinkedInScraper(
+                api_key=os.getenv("SEARCHAPI_API_KEY"),
+                query=searchapi_cfg.get("query", "Data Scientist"),
+                location=searchapi_cfg.get("location", "Israel"),
+            )
+            futures.append(tpe.submit(sa_scraper.fetch, as_of=as_of))
+
+        # LinkedIn via Playwright (optional, requires credentials) with pagination/time budget
+        li_pw_cfg = (sources_cfg.get("linkedin_playwright") or {})
+        if li_pw_cfg.get("enabled"):
+            headless = str(li_pw_cfg.get("headless", os.getenv("LINKEDIN_HEADLESS", "true"))).lower() == "true"
+            max_jobs = int(li_pw_cfg.get("max_jobs", os.getenv("LINKEDIN_MAX_JOBS", 60)))
+            max_pages = int(li_pw_cfg.get("max_pages", 8))
+            time_budget_sec = int(li_pw_cfg.get("time_budget_sec", 300))
+            li_pw = LinkedInPlaywrightScraper(
+                query=li_pw_cfg.get("query", "Data Scientist"),
+                location=li_pw_cfg.get("location", "Israel"),
+                headless=headless,
+                max_jobs=max_jobs,
+                max_pages=max_pages,
+                time_budget_sec=time_budget_sec,
+            )
+            futures.append(ppe.submit(li_pw.fetch, as_of=as_of))
+
+        # Greenhouse
+        greenhouse_cfg = (sources_cfg.get("greenhouse") or {})
+        if greenhouse_cfg.get("enabled"):
+            boards = greenhouse_cfg.get("companies") or []
+            gh_scraper = GreenhouseScraper(boards=boards, title_keywords=greenhouse_cfg.get("title_keywords"))
+            futures.append(tpe.submit(gh_scraper.fetch, as_of=as_of))
+
+        # Lever
+        lever_cfg = (sources_cfg.get("lever") or {})
+        if lever_cfg.get("enabled"):
+            companies = lever_cfg.get("companies") or []
+            lv_scraper = LeverScraper(companies=companies, title_keywords=lever_cfg.get("title_keywords"))
+            futures.append(tpe.submit(lv_scraper.fetch, as_of=as_of))
+
+        # Skip URLs already in the archive (or already taken from an earlier source)
+        for fut in futures:
+            all_postings.extend(_take_unseen(fut.result(), seen_urls))
 
     append_postings_to_csv(all_postings, cfg.csv_path, snapshot_id=snapshot_id)
     # Append this run to S3 archive.csv (if configured)
     try:
-        df_run = pd.DataFrame([p.to_row() for p in all_postings], columns=COLUMNS)
-        df_run["snapshot_id"] = snapshot_id
-        if not df_run.empty:
-            append_to_s3_archive(df_run)
+        if all_postings:
+            append_to_s3_archive(_run_table(all_postings, snapshot_id), rows_are_new=archive_checked)
     except Exception as e:
         print(f"[s3] archive append failed: {e}")
     return len(all_postings)
@@ -4,13 +4,14 @@ from pathlib import Path
 from playwright.sync_api import sync_playwright
 
 STATE_PATH = os.path.abspath(os.path.join(os.getcwd(), "data", "linkedin_state.json"))
+PROFILE_DIR = os.getenv("LINKEDIN_USER_DATA_DIR") or os.path.abspath(os.path.join(os.getcwd(), "data", "linkedin_profile"))
 
 
 def main() -> None:
     os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False, slow_mo=100)
-        context = browser.new_context()
+        # Log in inside the same persistent profile the scraper opens, so the session lives on in its cookies
+        context = p.chromium.launch_persistent_context(PROFILE_DIR, headless=False, slow_mo=100)
         page = context.new_page()
         page.set_default_timeout(180000)
         try:
@@ -21,10 +22,9 @@ def main() -> None:
             except Exception:
                 pass
             context.storage_state(path=STATE_PATH)
-            print(f"Saved LinkedIn session to {STATE_PATH}")
+            print(f"Saved LinkedIn session to {PROFILE_DIR} (and {STATE_PATH})")
         finally:
             context.close()
-            browser.close()
 
 
 if __name__ == "__main__":
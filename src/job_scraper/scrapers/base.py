@@ -1,11 +1,129 @@
 from __future__ import annotations
+import hashlib
+import json
+import os
+import re
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from typing import List
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, TypeVar
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import requests
+from requests.adapters import HTTPAdapter
 from ..models import JobPosting
 
+try:
+    # SIMD-validated parser straight from bytes; board payloads embed full HTML descriptions (content=true)
+    from orjson import loads as loads_json
+except ImportError:  # stdlib parser when orjson isn't installed
+    from json import loads as loads_json
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "16"))
+# Last body + validators (ETag / Last-Modified) per URL, for conditional GETs
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(os.getcwd(), "data", "http_cache"))
+
+# Israel location pattern shared by the ATS scrapers (spelling variants folded in)
+ISRAEL_PATTERN = r"israel|tel[- ]?aviv|jerusalem|haifa|herzliya|ra['’]?anana|be['’]?er[- ]?sheva"
+
+
+LINKEDIN_ORIGIN = "https://www.linkedin.com"
+# www. and country subdomains (il.linkedin.com, ...), anchored at the start: no lowercased copy, no full-string scan
+_LINKEDIN_URL_RE = re.compile(r"https?://(?:[a-z]{2,3}\.|www\.)?linkedin\.com/", re.IGNORECASE)
+
+
+def canonical_url(url: str) -> str:
+    # Absolute LinkedIn URL without its query string, so ?trk=... variants of one posting dedupe together
+    u = url.strip()
+    if u.startswith("/"):
+        u = f"{LINKEDIN_ORIGIN}{u}"
+    return u.split("?", 1)[0]
+
+
+def is_linkedin_url(url: str) -> bool:
+    return _LINKEDIN_URL_RE.match(url) is not None
+
+
+def keyword_pattern(keywords: Iterable[str]) -> str:
+    # Literal alternation valid for both Python re and Arrow's RE2 (re.escape also escapes spaces, which RE2 rejects)
+    return "|".join(re.sub(r"([\\.^$|?*+()\[\]{}])", r"\\\1", kw) for kw in keywords)
+
+
+def match_mask(values: List[str], pattern: str) -> np.ndarray:
+    # Case-insensitive regex test over a whole column in one Arrow (RE2) kernel call instead of a per-string loop
+    return pc.match_substring_regex(pa.array(values, type=pa.string()), pattern, ignore_case=True).to_numpy(
+        zero_copy_only=False
+    )
+
+
+@lru_cache(maxsize=1)
+def http_session() -> requests.Session:
+    # One pooled session per process: board/company fetches reuse TCP+TLS connections, and the pool is
+    # sized above SCRAPER_CONCURRENCY so concurrent workers never hit "Connection pool is full"
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(32, SCRAPER_CONCURRENCY))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_conditional(url: str, *, timeout: float = 30) -> Optional[bytes]:
+    # GET revalidated with If-None-Match / If-Modified-Since against the last stored response: an unchanged
+    # board answers 304 with no body and the stored bytes are reused. Returns None on any other non-200 status.
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    body_path = os.path.join(HTTP_CACHE_DIR, f"{key}.body")
+    meta_path = os.path.join(HTTP_CACHE_DIR, f"{key}.json")
+    meta: dict = {}
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        pass
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    resp = http_session().get(url, headers=headers, timeout=timeout)
+    if resp.status_code == 304 and meta:
+        try:
+            with open(body_path, "rb") as f:
+                return f.read()
+        except OSError:
+            # Stored body went missing: fetch unconditionally
+            resp = http_session().get(url, timeout=timeout)
+    if resp.status_code != 200:
+        return None
+    validators = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+    if any(validators.values()):
+        try:
+            os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(resp.content)
+            os.replace(body_path + ".tmp", body_path)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(validators, f)
+        except OSError:
+            pass  # read-only filesystem: next run simply downloads again
+    return resp.content
+
+
+def fetch_concurrently(fn: Callable[[T], R], items: Iterable[T], *, max_workers: Optional[int] = None) -> List[R]:
+    # IO-bound fan-out over boards/companies; results come back in input order
+    items = list(items)
+    if not items:
+        return []
+    workers = min(max_workers or SCRAPER_CONCURRENCY, len(items))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape") as ex:
+        return list(ex.map(fn, items))
+
 
 class ScraperBase(ABC):
     @abstractmethod
     def fetch(self, *, as_of: date) -> List[JobPosting]:
-        raise NotImplementedError 
\ No newline at end of file
+        raise NotImplementedError
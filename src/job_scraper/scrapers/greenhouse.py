@@ -1,70 +1,71 @@
 from __future__ import annotations
-import re
+import sys
 from datetime import date
 from typing import Iterable, List
-import requests
+import numpy as np
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ..models import JobPosting
-from .base import ScraperBase
+from .base import (
+    ISRAEL_PATTERN,
+    ScraperBase,
+    fetch_concurrently,
+    get_conditional,
+    keyword_pattern,
+    loads_json,
+    match_mask,
+)
 
 
-ISRAEL_KEYWORDS = [
-    "israel",
-    "tel aviv",
-    "tel-aviv",
-    "jerusalem",
-    "haifa",
-    "herzliya",
-    "ra'anana",
-    "beer sheva",
-    "be'er sheva",
-]
-
-
-def _looks_israel(location: str) -> bool:
-    s = location.lower()
-    return any(k in s for k in ISRAEL_KEYWORDS)
+# Shared by every posting: interned once so a run's rows all point at the same string objects
+_SOURCE = sys.intern("Greenhouse")
+_DEFAULT_LOCATION = sys.intern("Israel")
 
 
 class GreenhouseScraper(ScraperBase):
     def __init__(self, boards: Iterable[str], *, title_keywords: Iterable[str] | None = None):
         self.boards = list(boards)
         self.title_keywords = [kw.lower() for kw in (title_keywords or ["data scientist"])]
+        self._title_pattern = keyword_pattern(self.title_keywords)
 
     @retry(wait=wait_exponential(multiplier=1, min=1, max=8), stop=stop_after_attempt(3))
     def _fetch_board(self, board: str) -> List[dict]:
         url = f"https://boards-api.greenhouse.io/v1/boards/{board}/jobs?content=true"
-        resp = requests.get(url, timeout=30)
-        if resp.status_code != 200:
+        body = get_conditional(url, timeout=30)
+        if body is None:
             return []
-        data = resp.json() or {}
+        data = loads_json(body) or {}
         return data.get("jobs", [])
 
     def fetch(self, *, as_of: date) -> List[JobPosting]:
         results: List[JobPosting] = []
-        for board in self.boards:
-            jobs = self._fetch_board(board)
-            for job in jobs:
-                title: str = (job.get("title") or "").strip()
-                location_obj = job.get("location") or {}
-                location = (location_obj.get("name") or "").strip()
-                if not title:
-                    continue
-                title_l = title.lower()
-                if not any(kw in title_l for kw in self.title_keywords):
-                    continue
-                if location and not _looks_israel(location):
-                    continue
-                url = (job.get("absolute_url") or "").strip()
-                company = (job.get("company", {}).get("name") or board).strip()
-                results.append(
-                    JobPosting(
-                        source="Greenhouse",
-                        job_title=title,
-                        company=company or board,
-                        location=location or "Israel",
-                        url=url or f"https://boards.greenhouse.io/{board}",
-                        collected_at=as_of,
-                    )
+        # Fetch every board concurrently (retries run inside the workers), then filter all jobs at once
+        flat = [
+            (board, job)
+            for board, jobs in zip(self.boards, fetch_concurrently(self._fetch_board, self.boards))
+            for job in jobs
+        ]
+        titles = [(job.get("title") or "").strip() for _, job in flat]
+        locations = [((job.get("location") or {}).get("name") or "").strip() for _, job in flat]
+        # Title must match a keyword (empty titles never do); a location, when present, must look Israeli
+        keep = match_mask(titles, self._title_pattern) & (
+            ~np.array([bool(loc) for loc in locations], dtype=bool) | match_mask(locations, ISRAEL_PATTERN)
+        )
+        # Company fallback and board URL depend only on the board: build them once per board, not per posting
+        board_defaults = {board: (sys.intern(board), f"https://boards.greenhouse.io/{board}") for board in self.boards}
+        for i in np.flatnonzero(keep).tolist():
+            board, job = flat[i]
+            board_company, board_url = board_defaults[board]
+            location = locations[i]
+            url = (job.get("absolute_url") or "").strip()
+            company = (job.get("company", {}).get("name") or "").strip()
+            results.append(
+                JobPosting(
+                    source=_SOURCE,
+                    job_title=titles[i],
+                    company=sys.intern(company) if company else board_company,
+                    location=sys.intern(location) if location else _DEFAULT_LOCATION,
+                    url=url or board_url,
+                    collected_at=as_of,
                 )
-        return results 
\ No newline at end of file
+            )
+        return results
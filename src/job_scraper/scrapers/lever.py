@@ -1,67 +1,70 @@
 from __future__ import annotations
+import sys
 from datetime import date
 from typing import Iterable, List
-import requests
+import numpy as np
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ..models import JobPosting
-from .base import ScraperBase
+from .base import (
+    ISRAEL_PATTERN,
+    ScraperBase,
+    fetch_concurrently,
+    get_conditional,
+    keyword_pattern,
+    loads_json,
+    match_mask,
+)
 
 
-ISRAEL_KEYWORDS = [
-    "israel",
-    "tel aviv",
-    "tel-aviv",
-    "jerusalem",
-    "haifa",
-    "herzliya",
-    "ra'anana",
-    "beer sheva",
-    "be'er sheva",
-]
-
-
-def _looks_israel(location: str) -> bool:
-    s = location.lower()
-    return any(k in s for k in ISRAEL_KEYWORDS)
+# Shared by every posting: interned once so a run's rows all point at the same string objects
+_SOURCE = sys.intern("Lever")
+_DEFAULT_LOCATION = sys.intern("Israel")
 
 
 class LeverScraper(ScraperBase):
     def __init__(self, companies: Iterable[str], *, title_keywords: Iterable[str] | None = None):
         self.companies = list(companies)
         self.title_keywords = [kw.lower() for kw in (title_keywords or ["data scientist"])]
+        self._title_pattern = keyword_pattern(self.title_keywords)
 
     @retry(wait=wait_exponential(multiplier=1, min=1, max=8), stop=stop_after_attempt(3))
     def _fetch_company(self, company: str) -> List[dict]:
         url = f"https://api.lever.co/v0/postings/{company}?mode=json"
-        resp = requests.get(url, timeout=30)
-        if resp.status_code != 200:
+        body = get_conditional(url, timeout=30)
+        if body is None:
             return []
-        return resp.json() or []
+        return loads_json(body) or []
 
     def fetch(self, *, as_of: date) -> List[JobPosting]:
         results: List[JobPosting] = []
-        for company in self.companies:
-            jobs = self._fetch_company(company)
-            for job in jobs:
-                title: str = (job.get("text") or job.get("title") or "").strip()
-                location = (job.get("categories", {}).get("location") or "").strip()
-                if not title:
-                    continue
-                title_l = title.lower()
-                if not any(kw in title_l for kw in self.title_keywords):
-                    continue
-                if location and not _looks_israel(location):
-                    continue
-                url = (job.get("hostedUrl") or job.get("applyUrl") or "").strip()
-                company_name = (job.get("company") or company).strip()
-                results.append(
-                    JobPosting(
-                        source="Lever",
-                        job_title=title,
-                        company=company_name or company,
-                        location=location or "Israel",
-                        url=url or f"https://jobs.lever.co/{company}",
-                        collected_at=as_of,
-                    )
+        # Fetch every company concurrently (retries run inside the workers), then filter all jobs at once
+        flat = [
+            (company, job)
+            for company, jobs in zip(self.companies, fetch_concurrently(self._fetch_company, self.companies))
+            for job in jobs
+        ]
+        titles = [(job.get("text") or job.get("title") or "").strip() for _, job in flat]
+        locations = [(job.get("categories", {}).get("location") or "").strip() for _, job in flat]
+        # Title must match a keyword (empty titles never do); a location, when present, must look Israeli
+        keep = match_mask(titles, self._title_pattern) & (
+            ~np.array([bool(loc) for loc in locations], dtype=bool) | match_mask(locations, ISRAEL_PATTERN)
+        )
+        # Company fallback and board URL depend only on the company slug: build them once per company, not per posting
+        company_defaults = {company: (sys.intern(company), f"https://jobs.lever.co/{company}") for company in self.companies}
+        for i in np.flatnonzero(keep).tolist():
+            company, job = flat[i]
+            company_slug, company_url = company_defaults[company]
+            location = locations[i]
+            url = (job.get("hostedUrl") or job.get("applyUrl") or "").strip()
+            company_name = (job.get("company") or "").strip()
+            results.append(
+                JobPosting(
+                    source=_SOURCE,
+                    job_title=titles[i],
+                    company=sys.intern(company_name) if company_name else company_slug,
+                    location=sys.intern(location) if location else _DEFAULT_LOCATION,
+                    url=url or company_url,
+                    collected_at=as_of,
                 )
-        return results 
\ No newline at end of file
+            )
+        return results
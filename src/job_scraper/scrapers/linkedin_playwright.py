@@ -4,11 +4,12 @@ import re
 import time
 import json
 from datetime import date
-from typing import List, Optional, Any, Set
+from typing import Any, Callable, List, Optional, Set
 from tenacity import retry, stop_after_attempt, wait_exponential
+from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 from ..models import JobPosting
-from .base import ScraperBase
+from .base import LINKEDIN_ORIGIN, ScraperBase, canonical_url, fetch_concurrently, http_session
 
 # New helpers to block trackers and clear modal overlays
 
@@ -34,23 +35,44 @@ def clear_overlays(page) -> None:
         pass
 
 
+# All search-card fields in one browser-side pass: a single evaluate round-trip instead of several
+# query_selector / inner_text / get_attribute calls per card over the CDP connection
+_CARDS_JS = """
+() => Array.from(document.querySelectorAll('.base-card')).map(card => {
+  const text = sel => ((card.querySelector(sel) || {}).innerText || '').trim();
+  const a = card.querySelector('a.base-card__full-link');
+  return {
+    href: a ? (a.getAttribute('href') || '') : '',
+    title: text('.base-search-card__title'),
+    company: text('.base-search-card__subtitle'),
+    location: text('.job-search-card__location'),
+  };
+})
+"""
+
+
+_REPEATED_PHRASE_RE = re.compile(r"^(?P<p>.+?)(?:\s*\1)+$", flags=re.IGNORECASE)
+_WITH_VERIFICATION_RE = re.compile(r"\s+with verification\b", flags=re.IGNORECASE)
+
+
 def _normalize_title(title: str) -> str:
     t = " ".join((title or "").split())
     if not t:
         return t
     # Collapse exact duplicated phrase (with or without whitespace between repeats)
     # e.g., "Junior Data AnalystJunior Data Analyst" or "Title Title"
-    m = re.match(r"^(?P<p>.+?)(?:\s*\1)+$", t, flags=re.IGNORECASE)
+    m = _REPEATED_PHRASE_RE.match(t)
     if m:
         t = m.group("p").strip()
     tokens = t.split(" ")
+    # Strip a repeated leading phrase, longest first, until none is left. Each pass removes at least one token,
+    # so this is bounded by the title length; the repeat is deleted in place rather than rebuilding the list.
     changed = True
     while changed and len(tokens) >= 2:
         changed = False
-        max_k = len(tokens) // 2
-        for k in range(max_k, 0, -1):
+        for k in range(len(tokens) // 2, 0, -1):
             if tokens[:k] == tokens[k:2 * k]:
-                tokens = tokens[:k] + tokens[2 * k:]
+                del tokens[k:2 * k]
                 changed = True
                 break
     dedup: List[str] = []
@@ -58,7 +80,7 @@ def _normalize_title(title: str) -> str:
         if not dedup or dedup[-1].lower() != w.lower():
             dedup.append(w)
     t = " ".join(dedup)
-    t = re.sub(r"\s+with verification\b", "", t, flags=re.IGNORECASE).strip()
+    t = _WITH_VERIFICATION_RE.sub("", t).strip()
     return t
 
 
@@ -266,62 +288,46 @@ def _extract_location_from_topcard(page) -> str:
     return ""
 
 
-def _extract_location_from_guest_endpoint(context, job_url: str) -> str:
-    try:
-        m = re.search(r"/jobs/view/(\d+)/", job_url)
-        if not m:
-            return ""
-        job_id = m.group(1)
-        guest_url = f"https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{job_id}"
-        page = context.new_page()
-        page.set_default_timeout(20000)
-        page.goto(guest_url, timeout=20000)
-        try:
-            page.wait_for_selector(".topcard__flavor--bullet, .topcard__flavor", timeout=5000)
-        except Exception:
-            pass
-        # Collect bullet flavors and pick plausible city
-        bullets = []
-        for sel in [".topcard__flavor--bullet", ".topcard__flavor"]:
-            for el in page.query_selector_all(sel):
-                bullets.append((el.inner_text() or "").strip())
-        page.close()
-        for b in bullets:
-            if b and ("israel" in b.lower() or len(b.split()) <= 3):
-                return _normalize_location_text(b)
-        return ""
-    except Exception:
-        try:
-            page.close()
-        except Exception:
-            pass
-        return ""
+# Both /jobs/view/<id>/ and the slugged /jobs/view/<title>-at-<company>-<id> forms the search cards link to
+_JOB_ID_RE = re.compile(r"/jobs/view/(?:[^/?]*-)?(\d+)")
+# LinkedIn throttles bursts from one client: a few guest requests in flight already hide most of the latency
+MAX_PARALLEL_PAGES = 3
 
 
-def _extract_company_from_guest_endpoint(context, job_url: str) -> str:
+class _GuestSearchBlocked(Exception):
+    # The guest search endpoint answered with something other than a result page (429 throttle, 403, ...)
+    pass
+
+
+def _fetch_guest_posting(job_url: str) -> dict:
+    # Title, company and location from the public jobPosting fragment: plain server-rendered HTML, so it is
+    # fetched over the shared HTTP session (concurrently) rather than rendered in a browser page
+    m = _JOB_ID_RE.search(job_url)
+    if not m:
+        return {}
     try:
-        m = re.search(r"/jobs/view/(\d+)/", job_url)
-        if not m:
-            return ""
-        job_id = m.group(1)
-        guest_url = f"https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{job_id}"
-        page = context.new_page()
-        page.set_default_timeout(20000)
-        page.goto(guest_url, timeout=20000)
-        try:
-            page.wait_for_selector(".topcard__org-name-link, .topcard__flavor", timeout=5000)
-        except Exception:
-            pass
-        el = page.query_selector(".topcard__org-name-link") or page.query_selector(".topcard__flavor")
-        txt = (el.inner_text() or "").strip() if el else ""
-        page.close()
-        return txt
+        resp = http_session().get(f"{LINKEDIN_ORIGIN}/jobs-guest/jobs/api/jobPosting/{m.group(1)}", timeout=20)
+        if resp.status_code != 200:
+            return {}
+        soup = BeautifulSoup(resp.text, "html.parser")
     except Exception:
-        try:
-            page.close()
-        except Exception:
-            pass
-        return ""
+        return {}
+
+    def text(el) -> str:
+        return el.get_text(" ", strip=True) if el else ""
+
+    company = text(soup.select_one(".topcard__org-name-link") or soup.select_one(".topcard__flavor"))
+    # Collect bullet flavors and pick plausible city
+    location = ""
+    for sel in [".topcard__flavor--bullet", ".topcard__flavor"]:
+        for el in soup.select(sel):
+            b = text(el)
+            if b and ("israel" in b.lower() or len(b.split()) <= 3):
+                location = _normalize_location_text(b)
+                break
+        if location:
+            break
+    return {"title": text(soup.select_one(".topcard__title")), "company": company, "location": location}
 
 
 class LinkedInPlaywrightScraper(ScraperBase):
@@ -340,6 +346,7 @@ class LinkedInPlaywrightScraper(ScraperBase):
         seen_urls: Optional[Set[str]] = None,
         min_new: int = 10,
         time_window: str = "r604800",
+        user_data_dir: Optional[str] = None,
     ) -> None:
         self.email = email or os.getenv("LINKEDIN_EMAIL")
         self.password = password or os.getenv("LINKEDIN_PASSWORD")
@@ -356,6 +363,12 @@ class LinkedInPlaywrightScraper(ScraperBase):
         default_state = os.path.abspath(os.path.join(os.getcwd(), "data", "linkedin_state.json"))
         state_env = os.getenv("LINKEDIN_STORAGE_STATE") or os.getenv("STORAGE_STATE")
         self.storage_state_path = storage_state_path or state_env or default_state
+        # Persistent Chromium profile: cookies and the HTTP cache survive between runs, so repeat searches skip
+        # cold-cache renders and consent/login redirects
+        default_profile = os.path.abspath(os.path.join(os.getcwd(), "data", "linkedin_profile"))
+        self.user_data_dir = user_data_dir or os.getenv("LINKEDIN_USER_DATA_DIR") or default_profile
+        self._pw = None
+        self._context = None
 
     def _guard_creds(self) -> None:
         if not os.path.exists(self.storage_state_path) and (not self.email or not self.password):
@@ -363,102 +376,214 @@ class LinkedInPlaywrightScraper(ScraperBase):
                 "LinkedIn credentials are missing. Set LINKEDIN_EMAIL and LINKEDIN_PASSWORD in .env, or provide a storage state file."
             )
 
-    def _collect_links_via_guest_search(self, context, start: int) -> List[str]:
-        url = (
-            "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
+    def _guest_search_url(self, start: int) -> str:
+        return (
+            f"{LINKEDIN_ORIGIN}/jobs-guest/jobs/api/seeMoreJobPostings/search"
             f"?keywords={self.query.replace(' ', '%20')}"
             f"&location={self.location.replace(' ', '%20')}"
             f"&f_TPR={self.time_window}&sortBy=DD&start={start}"
         )
-        page = context.new_page()
-        page.set_default_timeout(20000)
-        page.goto(url, timeout=20000)
-        links: List[str] = []
-        for a in page.query_selector_all("a.base-card__full-link"):
-            href = a.get_attribute("href") or ""
+
+    def _collect_cards_via_http(self, start: int) -> List[dict]:
+        # The guest search endpoint returns server-rendered card HTML, so no browser is needed to read it
+        resp = http_session().get(self._guest_search_url(start), timeout=20)
+        if resp.status_code != 200:
+            # Throttled or refused, as opposed to an empty result page: the caller falls back to the browser
+            raise _GuestSearchBlocked(f"guest search returned HTTP {resp.status_code}")
+        cards: List[dict] = []
+        for card in BeautifulSoup(resp.text, "html.parser").select(".base-card"):
+            a = card.select_one("a.base-card__full-link")
+            href = (a.get("href") or "") if a else ""
+            if not href:
+                continue
+            fields = {"url": canonical_url(href)}
+            for key, sel in (
+                ("title", ".base-search-card__title"),
+                ("company", ".base-search-card__subtitle"),
+                ("location", ".job-search-card__location"),
+            ):
+                el = card.select_one(sel)
+                fields[key] = el.get_text(" ", strip=True) if el else ""
+            cards.append(fields)
+        return cards
+
+    def _collect_cards_via_guest_search(self, page, start: int) -> List[dict]:
+        url = self._guest_search_url(start)
+        # Proceed as soon as the cards are in the DOM instead of waiting for the full load event (images, trackers)
+        page.goto(url, timeout=20000, wait_until="domcontentloaded")
+        try:
+            page.wait_for_function("() => document.querySelectorAll('.base-card').length > 0", timeout=5000)
+        except PlaywrightTimeoutError:
+            pass  # empty page: past the last result
+        # Search cards already carry title/company/location, so most postings never need a detail page
+        cards: List[dict] = []
+        for card in page.evaluate(_CARDS_JS):
+            href = card.pop("href")
             if not href:
                 continue
-            if href.startswith("/"):
-                href = "https://www.linkedin.com" + href
-            href = href.split("?", 1)[0]
-            links.append(href)
+            card["url"] = canonical_url(href)
+            cards.append(card)
+        return cards
+
+    def _ensure_context(self):
+        # Browser + persistent context live on the instance, so a tenacity retry re-runs the scrape on the
+        # already-running Chromium instead of paying another cold launch
+        if self._context is None:
+            fresh_profile = not os.path.isdir(self.user_data_dir)
+            if self._pw is None:
+                self._pw = sync_playwright().start()
+            context = self._pw.chromium.launch_persistent_context(self.user_data_dir, headless=self.headless)
+            # A crashed/closed browser drops the handle so the next attempt relaunches
+            context.on("close", lambda _: setattr(self, "_context", None))
+            if fresh_profile and os.path.exists(self.storage_state_path):
+                # Seed a brand-new profile from a saved session once; afterwards the profile carries its own cookies
+                try:
+                    with open(self.storage_state_path, "r", encoding="utf-8") as f:
+                        context.add_cookies(json.load(f).get("cookies") or [])
+                except Exception:
+                    pass
+            self._context = context
+        return self._context
+
+    def close(self) -> None:
+        context, pw = self._context, self._pw
+        self._context = self._pw = None
+        if context is not None:
+            try:
+                context.close()
+            except Exception:
+                pass
+        if pw is not None:
+            pw.stop()
+
+    def fetch(self, *, as_of: date) -> List[JobPosting]:
         try:
-            page.close()
-        except Exception:
-            pass
-        return links
+            return self._scrape(as_of)
+        finally:
+            self.close()
+
+    def _pick_new_cards(self, collect: Callable[[int], List[dict]], *, parallel: int = 1) -> List[dict]:
+        # Page through guest search results until min_new unseen cards, the page cap or the time budget.
+        # With parallel > 1 the next few start offsets are requested together (independent GETs) and then
+        # consumed in order, so the result is the same as walking them one by one.
+        # Raises _GuestSearchBlocked when the collector is blocked before any new card was picked.
+        def collect_or_empty(start: int) -> Optional[List[dict]]:
+            try:
+                return collect(start)
+            except _GuestSearchBlocked:
+                return None
+            except Exception:
+                return []
+
+        new_cards: List[dict] = []
+        picked: Set[str] = set()
+        start = 0
+        pages_left = max(1, self.max_pages)
+        deadline = time.time() + max(30, self.time_budget_sec)
+        while pages_left > 0:
+            if time.time() > deadline or len(new_cards) >= self.min_new:
+                break
+            wave = min(max(1, parallel), pages_left)
+            starts = [start + 25 * i for i in range(wave)]
+            # A single page stays on this thread: the Playwright collector's sync page objects are thread-bound
+            batches = fetch_concurrently(collect_or_empty, starts, max_workers=wave) if wave > 1 else [collect_or_empty(start)]
+            for batch in batches:
+                if batch is None:
+                    if not new_cards:
+                        raise _GuestSearchBlocked(f"guest search blocked at start={start}")
+                    return new_cards  # keep what the earlier pages gave
+                if not batch:
+                    return new_cards  # past the last result page
+                for card in batch:
+                    u = card["url"]
+                    if u not in self.seen_urls and u not in picked:
+                        picked.add(u)
+                        new_cards.append(card)
+                        if len(new_cards) >= self.min_new:
+                            return new_cards
+            start += 25 * wave
+            pages_left -= wave
+        return new_cards
 
     @retry(wait=wait_exponential(multiplier=1, min=1, max=6), stop=stop_after_attempt(2))
-    def fetch(self, *, as_of: date) -> List[JobPosting]:
-        # Guest search does not require login; storage state optional
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
-            context = browser.new_context()
+    def _scrape(self, as_of: date) -> List[JobPosting]:
+        # Guest search does not require login. Read it over plain HTTP first; Chromium is only started when that
+        # is blocked (throttled / non-200) or when a card still lacks fields after the guest fragments. An empty
+        # search, or one whose cards were all seen already, returns without launching the browser.
+        try:
+            new_cards = self._pick_new_cards(self._collect_cards_via_http, parallel=MAX_PARALLEL_PAGES)
+        except _GuestSearchBlocked:
+            # Page through guest search on one tab: each result page is navigated in place rather than in a
+            # freshly opened (and torn down) page per request
+            search_page = self._ensure_context().new_page()
+            search_page.set_default_timeout(20000)
             try:
-                new_urls: List[str] = []
-                start = 0
-                deadline = time.time() + max(30, self.time_budget_sec)
-                # Page through guest search
-                for page_idx in range(max(1, self.max_pages)):
-                    if time.time() > deadline or len(new_urls) >= self.min_new:
-                        break
-                    batch = []
-                    try:
-                        batch = self._collect_links_via_guest_search(context, start)
-                    except Exception:
-                        batch = []
-                    if not batch:
-                        break
-                    for u in batch:
-                        if u not in self.seen_urls and u not in new_urls:
-                            new_urls.append(u)
-                            if len(new_urls) >= self.min_new:
-                                break
-                    start += 25
-
-                # Build postings for up to max_jobs
-                jobs: List[JobPosting] = []
-                for url in new_urls[: self.max_jobs]:
-                    comp = _extract_company_from_guest_endpoint(context, url) or ""
-                    loc = _extract_location_from_guest_endpoint(context, url) or self.location
-
-                    # Try to grab title from the detail page quickly
-                    title_raw = ""
-                    page = context.new_page()
-                    page.set_default_timeout(20000)
-                    try:
-                        page.goto(url, timeout=20000)
-                        try:
-                            page.wait_for_selector(".jobs-unified-top-card, .topcard", timeout=5000)
-                        except Exception:
-                            pass
-                        h1 = page.query_selector("h1.jobs-unified-top-card__job-title, h1.topcard__title")
-                        if h1:
-                            title_raw = (h1.inner_text() or "").strip()
-                        if not comp:
-                            comp = _extract_company_from_json(page) or _extract_company_from_topcard(page) or comp
-                        if not loc:
-                            loc = _extract_location_from_json(page) or _extract_location_from_topcard(page) or loc
-                    except Exception:
-                        pass
-                    finally:
-                        try:
-                            page.close()
-                        except Exception:
-                            pass
-
-                    jobs.append(
-                        JobPosting(
-                            source="LinkedIn (Playwright)",
-                            job_title=_normalize_title(title_raw) or "",
-                            company=(comp or "").strip(),
-                            location=loc or self.location,
-                            url=url,
-                            collected_at=as_of,
-                        )
+                new_cards = self._pick_new_cards(lambda start: self._collect_cards_via_guest_search(search_page, start))
+            finally:
+                try:
+                    search_page.close()
+                except Exception:
+                    pass
+
+        # Build postings for up to max_jobs
+        jobs: List[JobPosting] = []
+        cards = new_cards[: self.max_jobs]
+        # Cards lacking a title or company: fetch their guest fragments concurrently, a few in flight
+        incomplete = [c["url"] for c in cards if not (c["title"] and c["company"])]
+        guest = dict(zip(incomplete, fetch_concurrently(_fetch_guest_posting, incomplete, max_workers=MAX_PARALLEL_PAGES)))
+        for card in cards:
+            url = card["url"]
+            g = guest.get(url) or {}
+            title_raw = card["title"] or g.get("title", "")
+            comp = card["company"] or g.get("company", "")
+            loc = _normalize_location_text(card["location"]) or g.get("location") or self.location
+            if title_raw and comp:
+                jobs.append(
+                    JobPosting(
+                        source="LinkedIn (Playwright)",
+                        job_title=_normalize_title(title_raw) or "",
+                        company=comp,
+                        location=loc,
+                        url=url,
+                        collected_at=as_of,
                     )
+                )
+                continue
 
-                return jobs
+            # Still incomplete: fall back to the rendered detail page
+            page = self._ensure_context().new_page()
+            page.set_default_timeout(20000)
+            try:
+                page.goto(url, timeout=20000, wait_until="domcontentloaded")
+                try:
+                    page.wait_for_selector(".jobs-unified-top-card, .topcard", timeout=2000)
+                except Exception:
+                    pass
+                h1 = page.query_selector("h1.jobs-unified-top-card__job-title, h1.topcard__title")
+                if h1:
+                    title_raw = (h1.inner_text() or "").strip() or title_raw
+                if not comp:
+                    comp = _extract_company_from_json(page) or _extract_company_from_topcard(page) or comp
+                if not loc:
+                    loc = _extract_location_from_json(page) or _extract_location_from_topcard(page) or loc
+            except Exception:
+                pass
             finally:
-                context.close()
-                browser.close() 
\ No newline at end of file
+                try:
+                    page.close()
+                except Exception:
+                    pass
+
+            jobs.append(
+                JobPosting(
+                    source="LinkedIn (Playwright)",
+                    job_title=_normalize_title(title_raw) or "",
+                    company=(comp or "").strip(),
+                    location=loc or self.location,
+                    url=url,
+                    collected_at=as_of,
+                )
+            )
+
+        return jobs
+ 
\ No newline at end of file
@@ -5,7 +5,7 @@ import os
 import requests
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ..models import JobPosting
-from .base import ScraperBase
+from .base import ScraperBase, canonical_url, is_linkedin_url
 
 
 class SearchApiLinkedInScraper(ScraperBase):
@@ -43,7 +43,7 @@ class SearchApiLinkedInScraper(ScraperBase):
             # Accept either LinkedIn as 'via' or presence of linkedin.com in apply links
             via = (item.get("via") or "").lower()
             apply_options = item.get("apply_options") or []
-            has_linkedin_apply = any("linkedin.com" in (opt.get("link") or "").lower() for opt in apply_options)
+            has_linkedin_apply = any(is_linkedin_url((opt.get("link") or "").strip()) for opt in apply_options)
             if "linkedin" not in via and not has_linkedin_apply:
                 continue
             title = (item.get("title") or "").strip()
@@ -52,8 +52,8 @@ class SearchApiLinkedInScraper(ScraperBase):
             url = None
             for opt in apply_options:
                 link = (opt.get("link") or "").strip()
-                if "linkedin.com" in link:
-                    url = link
+                if is_linkedin_url(link):
+                    url = canonical_url(link)
                     break
             if not url:
                 # Fallback to any related link or job_id
@@ -5,31 +5,18 @@ import os
 import requests
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ..models import JobPosting
-from .base import ScraperBase
+from .base import ScraperBase, canonical_url, is_linkedin_url
 
 
 def _canonical_linkedin_url(url: str) -> Optional[str]:
-    if not url:
-        return None
-    u = url.strip()
-    if u.startswith("/"):
-        u = f"https://www.linkedin.com{u}"
-    if "linkedin.com" not in u.lower():
-        return None
-    if "?" in u:
-        u = u.split("?")[0]
-    return u
+    u = _canonical_url(url)
+    return u if u and is_linkedin_url(u) else None
 
 
 def _canonical_url(url: str) -> Optional[str]:
     if not url:
         return None
-    u = url.strip()
-    if u.startswith("/"):
-        u = f"https://www.linkedin.com{u}"
-    if "?" in u:
-        u = u.split("?")[0]
-    return u
+    return canonical_url(url)
 
 
 class SerpapiLinkedInScraper(ScraperBase):
@@ -29,10 +29,11 @@ def append_postings_to_csv(postings: List[JobPosting], csv_path: str, snapshot_i
         existing = pd.read_csv(csv_path)
         existing = _ensure_columns(existing)
         combined = pd.concat([existing, new_df], ignore_index=True)
-        # Prefer rows that have a non-empty company for the same URL
+        # Prefer rows that have a non-empty company for the same URL: order only by the cheap keys and let the
+        # hash-based drop_duplicates pick each url's winner (no string sort over every url)
         combined["company_len"] = combined["company"].fillna("").astype(str).str.len()
         combined = (
-            combined.sort_values(["url", "company_len", "collected_at"]).drop_duplicates(subset=["url"], keep="last")
+            combined.sort_values(["company_len", "collected_at"], kind="stable").drop_duplicates(subset=["url"], keep="last")
             .drop(columns=["company_len"])  # tidy
             .sort_values(["collected_at", "company", "job_title"])  # final order
             .reset_index(drop=True)